@@ -0,0 +1,82 @@
+'''
+Benchmark for the per-award loop (presenters, nominees and winner of every award).
+Times process_awards over the award list of data/gg{year}answers.json serially and on thread and process pools
+of increasing size, and checks every run gives the same output as the serial one.
+
+Run from the repository root, e.g. 'python -m benchmarks.award_loop 2013 --max-workers 8'
+'''
+import json
+import time
+import argparse
+from main import process_awards
+from util_functions.cache_utils import cached_preprocess_tweets
+from util_functions.corpus_utils import build_corpus
+from util_functions.preprocessing_utils import ANALYSIS_COLUMNS
+from benchmarks.ner_scaling import process_counts
+
+
+def run_award_loop(df, award_names, host_names, corpus, max_workers):
+    '''
+    Returns the wall time of the award loop for each executor and number of workers.
+
+    Example output:
+    [
+        {"Executor": "serial", "Workers": 1, "Seconds": 12.4, "Speedup": 1.0, "Identical": True},
+        {"Executor": "thread", "Workers": 2, "Seconds": 11.9, "Speedup": 1.04, "Identical": True},
+        {"Executor": "process", "Workers": 2, "Seconds": 6.8, "Speedup": 1.82, "Identical": True},
+        ...
+    ]
+    '''
+    runs = [("serial", 1)]
+    for workers in process_counts(max_workers):
+        if workers > 1:
+            runs += [("thread", workers), ("process", workers)]
+
+    results = []
+    expected = None
+    for executor, workers in runs:
+        start = time.perf_counter()
+        output = process_awards(df, award_names, host_names, corpus, workers, "thread" if executor == "serial" else executor)
+        seconds = time.perf_counter() - start
+        if expected is None:
+            expected = output
+        results.append({
+            "Executor": executor,
+            "Workers": workers,
+            "Seconds": seconds,
+            "Speedup": results[0]["Seconds"] / seconds if results else 1.0,
+            "Identical": output == expected
+        })
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the per-award loop serially and on thread and process pools.")
+    parser.add_argument("year", nargs="?", type=int, default=2013, help="year of the ceremony, reads data/gg{year}.json and data/gg{year}answers.json")
+    parser.add_argument("--max-workers", type=int, default=4, help="largest pool size to try")
+    parser.add_argument("--output", default=None, help="also write the results as JSON to this file")
+    args = parser.parse_args()
+
+    df = cached_preprocess_tweets(f"data/gg{args.year}.json", columns=ANALYSIS_COLUMNS)
+    corpus = build_corpus(df)
+    with open(f"data/gg{args.year}answers.json", 'r') as f:
+        answers_data = json.load(f)
+    award_names = list(answers_data['award_data'].keys())
+    host_names = answers_data['hosts']
+
+    results = run_award_loop(df, award_names, host_names, corpus, args.max_workers)
+
+    print(f"Award loop over {len(award_names)} awards and {len(df)} tweets")
+    print(f"{'Executor':>8} {'Workers':>7} {'Seconds':>8} {'Speedup':>8} Identical")
+    for result in results:
+        print(f"{result['Executor']:>8} {result['Workers']:>7} {result['Seconds']:>8.2f} {result['Speedup']:>7.2f}x {str(result['Identical']):>9}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"Awards": len(award_names), "Tweets": len(df), "Runs": results}, f, indent=4)
+        print(f"Award loop benchmark saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+'''
+Speed/accuracy report for the entity extractor backends (see ENTITY_BACKENDS).
+For each backend, times the corpus-wide entity extraction (see build_entity_table) in tweets/sec, runs the hardcoded
+pipeline on its entities, and scores the hosts, presenters, nominees and winners against data/gg{year}answers.json.
+Backends whose model is not installed are skipped.
+
+Run from the repository root, e.g. 'python -m benchmarks.entity_backends 2013 --backends lg sm rules'
+'''
+import json
+import time
+import argparse
+from main import find_hosts, process_awards
+from util_functions.cache_utils import cached_preprocess_tweets
+from util_functions.corpus_utils import build_corpus
+from util_functions.preprocessing_utils import ANALYSIS_COLUMNS
+from util_functions.model_utils import get_nlp, set_entity_backend, ENTITY_BACKENDS
+
+
+def recall(found, expected):
+    # Share of the expected names that were found, ignoring case
+    if not expected:
+        return 1.0
+    found = {name.lower() for name in found}
+    return sum(name.lower() in found for name in expected) / len(expected)
+
+
+def score_answers(hosts, award_data, answers_data):
+    '''
+    Scores the answers of a run against the answers file: the recall of the hosts, presenters and nominees
+    (averaged over the awards) and the share of awards with the right winner.
+    '''
+    awards = answers_data['award_data']
+    return {
+        "Hosts": recall(hosts, answers_data['hosts']),
+        "Presenters": sum(recall(award_data[award]["Presenters"], answers['presenters']) for award, answers in awards.items()) / len(awards),
+        "Nominees": sum(recall(award_data[award]["Nominees"], answers['nominees']) for award, answers in awards.items()) / len(awards),
+        "Winners": sum(award_data[award]["Winner"].lower() == answers['winner'].lower() for award, answers in awards.items()) / len(awards)
+    }
+
+
+def run_backend(df, backend, answers_data):
+    '''
+    Runs the hardcoded pipeline with the backend and returns its throughput and scores, or None if its model is not installed.
+
+    Example output:
+    {"Backend": "rules", "Tweets/sec": 21500.3, "Seconds": 0.8, "Hosts": 0.5, "Presenters": 0.31, "Nominees": 0.22, "Winners": 0.35}
+    '''
+    set_entity_backend(backend)
+    try:
+        # Load the model up front so it isn't part of the measurement
+        get_nlp()
+    except OSError:
+        return None
+
+    start = time.perf_counter()
+    corpus = build_corpus(df)
+    seconds = time.perf_counter() - start
+
+    host_names = [host[0] for host in find_hosts(df, corpus["entities"], corpus["tokens"])]
+    award_names = list(answers_data['award_data'].keys())
+    _, json_output = process_awards(df, award_names, host_names, corpus)
+
+    return {
+        "Backend": backend,
+        "Tweets/sec": len(df) / seconds,
+        "Seconds": seconds,
+        **score_answers(host_names, json_output["award_data"], answers_data)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the entity extractor backends on speed and accuracy.")
+    parser.add_argument("year", nargs="?", type=int, default=2013, help="year of the ceremony, reads data/gg{year}.json and data/gg{year}answers.json")
+    parser.add_argument("--backends", nargs="+", choices=list(ENTITY_BACKENDS), default=list(ENTITY_BACKENDS), help="backends to compare")
+    parser.add_argument("--output", default=None, help="also write the results as JSON to this file")
+    args = parser.parse_args()
+
+    df = cached_preprocess_tweets(f"data/gg{args.year}.json", columns=ANALYSIS_COLUMNS)
+    with open(f"data/gg{args.year}answers.json", 'r') as f:
+        answers_data = json.load(f)
+
+    results = []
+    for backend in args.backends:
+        result = run_backend(df, backend, answers_data)
+        if result is None:
+            print(f"Skipping {backend}: {ENTITY_BACKENDS[backend]} is not installed")
+            continue
+        results.append(result)
+
+    print(f"Entity backends on {len(df)} tweets")
+    print(f"{'Backend':>8} {'Tweets/sec':>11} {'Hosts':>6} {'Presenters':>11} {'Nominees':>9} {'Winners':>8}")
+    for result in results:
+        print(f"{result['Backend']:>8} {result['Tweets/sec']:>11.1f} {result['Hosts']:>6.2f} {result['Presenters']:>11.2f} "
+              f"{result['Nominees']:>9.2f} {result['Winners']:>8.2f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"Tweets": len(df), "Backends": results}, f, indent=4)
+        print(f"Entity backend report saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
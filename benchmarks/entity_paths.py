@@ -0,0 +1,81 @@
+'''
+Benchmark for the two ways the stages get their entities.
+Times find_hosts and the presenters of every award of data/gg{year}answers.json once on the fallback path, which runs NER
+over the stage's tweets itself (named_entity_recognition), and once on the corpus entity table, and checks both find the same names.
+This is also the only run of the fallback path, so a stage that breaks it shows up here.
+
+Run from the repository root, e.g. 'python -m benchmarks.entity_paths 2013'
+'''
+import json
+import time
+import argparse
+from main import find_hosts, get_award_presenters
+from util_functions.cache_utils import cached_preprocess_tweets
+from util_functions.corpus_utils import build_corpus, index_awards
+from util_functions.preprocessing_utils import ANALYSIS_COLUMNS
+
+
+def run_stages(df, award_names, corpus=None):
+    # The hosts and the presenters of every award, from the corpus if it is given and by running NER otherwise
+    entities = corpus["entities"] if corpus else None
+    token_index = corpus["tokens"] if corpus else None
+    presenter_postings = corpus["presenter_postings"] if corpus else None
+    host_names = [host[0] for host in find_hosts(df, entities, token_index)]
+    presenters = {
+        award_name: [presenter['Name'] for presenter in get_award_presenters(df, award_name, host_names, entities, presenter_postings)]
+        for award_name in award_names
+    }
+    return {"Hosts": host_names, "Presenters": presenters}
+
+
+def run_entity_paths(df, award_names):
+    '''
+    Times the stages on both paths and compares their answers.
+
+    Example output:
+    {"Fallback Seconds": 95.2, "Corpus Seconds": 14.8, "Identical Hosts": True, "Identical Presenters": 24, "Awards": 26}
+    '''
+    start = time.perf_counter()
+    fallback = run_stages(df, award_names)
+    fallback_seconds = time.perf_counter() - start
+
+    # Building the corpus is part of the corpus path, as every stage shares it
+    start = time.perf_counter()
+    corpus = index_awards(build_corpus(df), df, award_names)
+    answers = run_stages(df, award_names, corpus)
+    corpus_seconds = time.perf_counter() - start
+
+    return {
+        "Fallback Seconds": fallback_seconds,
+        "Corpus Seconds": corpus_seconds,
+        "Identical Hosts": fallback["Hosts"] == answers["Hosts"],
+        "Identical Presenters": sum(fallback["Presenters"][award] == answers["Presenters"][award] for award in award_names),
+        "Awards": len(award_names)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the stages with NER per stage and with the corpus entity table.")
+    parser.add_argument("year", nargs="?", type=int, default=2013, help="year of the ceremony, reads data/gg{year}.json and data/gg{year}answers.json")
+    parser.add_argument("--output", default=None, help="also write the results as JSON to this file")
+    args = parser.parse_args()
+
+    df = cached_preprocess_tweets(f"data/gg{args.year}.json", columns=ANALYSIS_COLUMNS)
+    with open(f"data/gg{args.year}answers.json", 'r') as f:
+        award_names = list(json.load(f)['award_data'].keys())
+
+    result = run_entity_paths(df, award_names)
+
+    print(f"Entity paths on {len(df)} tweets and {result['Awards']} awards")
+    print(f"Fallback (NER per stage): {result['Fallback Seconds']:.2f}s")
+    print(f"Corpus entity table: {result['Corpus Seconds']:.2f}s")
+    print(f"Same hosts: {result['Identical Hosts']}, same presenters for {result['Identical Presenters']} of {result['Awards']} awards")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"Tweets": len(df), **result}, f, indent=4)
+        print(f"Entity path benchmark saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
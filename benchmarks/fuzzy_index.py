@@ -0,0 +1,85 @@
+'''
+Benchmark for fuzzy entity resolution.
+Matches every name of data/gg{year}answers.json against the distinct entity names of the corpus, once by scanning every
+entity (compute_edit_distance) and once through the fuzzy index (nearest_entities), and cross-checks both give the same matches.
+
+Run from the repository root, e.g. 'python -m benchmarks.fuzzy_index 2013 --top-n 5'
+'''
+import json
+import time
+import argparse
+from util_functions.aggregation_utils import compute_edit_distance
+from util_functions.fuzzy_utils import build_fuzzy_index, nearest_entities
+from util_functions.cache_utils import cached_preprocess_tweets
+from util_functions.corpus_utils import build_corpus
+from util_functions.preprocessing_utils import ANALYSIS_COLUMNS
+
+
+def answer_names(answers_data):
+    # Every host, presenter, nominee and winner name of the answers, in order, without duplicates
+    names = list(answers_data['hosts'])
+    for award in answers_data['award_data'].values():
+        names += award['presenters'] + award['nominees'] + [award['winner']]
+    return list(dict.fromkeys(names))
+
+
+def run_fuzzy_index(entity_list, queries, top_n):
+    '''
+    Times resolving the queries against the entities with a linear scan and with the fuzzy index.
+
+    Example output:
+    {"Entities": 5210, "Queries": 151, "Build Seconds": 1.2, "Index Seconds": 3.1, "Scan Seconds": 41.7, "Identical": True}
+    '''
+    start = time.perf_counter()
+    for query in queries:
+        expected = compute_edit_distance(query, entity_list)[:top_n]
+    scan_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index = build_fuzzy_index(entity_list)
+    build_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    found = [nearest_entities(index, query, top_n) for query in queries]
+    index_seconds = time.perf_counter() - start
+
+    # Scan again outside the timings to cross-check every match
+    identical = all(matches == compute_edit_distance(query, entity_list)[:top_n] for query, matches in zip(queries, found))
+
+    return {
+        "Entities": index["size"],
+        "Queries": len(queries),
+        "Build Seconds": build_seconds,
+        "Index Seconds": index_seconds,
+        "Scan Seconds": scan_seconds,
+        "Identical": identical
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare fuzzy entity resolution through the fuzzy index with a linear scan.")
+    parser.add_argument("year", nargs="?", type=int, default=2013, help="year of the ceremony, reads data/gg{year}.json and data/gg{year}answers.json")
+    parser.add_argument("--top-n", type=int, default=5, help="number of closest entities to find for each name")
+    parser.add_argument("--output", default=None, help="also write the results as JSON to this file")
+    args = parser.parse_args()
+
+    df = cached_preprocess_tweets(f"data/gg{args.year}.json", columns=ANALYSIS_COLUMNS)
+    entity_list = build_corpus(df)["entities"]['text'].cat.categories.tolist()
+    with open(f"data/gg{args.year}answers.json", 'r') as f:
+        queries = answer_names(json.load(f))
+
+    result = run_fuzzy_index(entity_list, queries, args.top_n)
+
+    print(f"Resolved {result['Queries']} names against {result['Entities']} entities")
+    print(f"Linear scan: {result['Scan Seconds']:.2f}s")
+    print(f"Fuzzy index: {result['Index Seconds']:.2f}s (+{result['Build Seconds']:.2f}s to build)")
+    print(f"Identical matches: {result['Identical']}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=4)
+        print(f"Fuzzy index benchmark saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+'''
+Scaling report for the corpus-wide NER pass (see build_entity_table).
+Runs NER over the same tweets with 1, 2, 4, ... up to N processes and reports tweets/sec for each,
+checking that every run produces the same entity table as the single process run.
+
+Run from the repository root, e.g. 'python -m benchmarks.ner_scaling 2013 --max-processes 32'
+'''
+import os
+import json
+import time
+import argparse
+from util_functions.preprocessing_utils import preprocess_tweets
+from util_functions.entity_utils import build_entity_table, NER_BATCH_SIZE
+from util_functions.model_utils import get_nlp
+
+
+def process_counts(max_processes):
+    # Powers of two up to max_processes, always ending with max_processes itself
+    counts = []
+    n = 1
+    while n < max_processes:
+        counts.append(n)
+        n *= 2
+    counts.append(max_processes)
+    return counts
+
+
+def run_scaling(df, max_processes, batch_size=NER_BATCH_SIZE):
+    '''
+    Returns one result per process count.
+
+    Example output:
+    [
+        {"Processes": 1, "Seconds": 120.5, "Tweets/sec": 1450.2, "Speedup": 1.0, "Identical": True},
+        ...
+    ]
+    '''
+    # Load the model up front so it isn't part of the first measurement
+    get_nlp()
+
+    results = []
+    serial_entities = None
+    for n_process in process_counts(max_processes):
+        start = time.perf_counter()
+        entities = build_entity_table(df, batch_size=batch_size, n_process=n_process)
+        elapsed = time.perf_counter() - start
+
+        if serial_entities is None:
+            serial_entities = entities
+        results.append({
+            "Processes": n_process,
+            "Seconds": elapsed,
+            "Tweets/sec": len(df) / elapsed,
+            "Speedup": results[0]["Seconds"] / elapsed if results else 1.0,
+            "Identical": entities.equals(serial_entities)
+        })
+        print(f"{n_process:>9} {elapsed:>9.2f} {len(df) / elapsed:>11.1f} {results[-1]['Speedup']:>8.2f}x {results[-1]['Identical']}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure NER throughput from 1 up to N processes.")
+    parser.add_argument("year", nargs="?", type=int, default=2013, help="year of the ceremony, reads data/gg{year}.json")
+    parser.add_argument("--max-processes", type=int, default=os.cpu_count(), help="largest number of processes to try")
+    parser.add_argument("--batch-size", type=int, default=NER_BATCH_SIZE, help="number of tweets per NER batch")
+    parser.add_argument("--limit", type=int, default=None, help="only use the first LIMIT tweets")
+    parser.add_argument("--output", default=None, help="also write the results as JSON to this file")
+    args = parser.parse_args()
+
+    df = preprocess_tweets(f"data/gg{args.year}.json")
+    if args.limit:
+        df = df.head(args.limit)
+
+    print(f"NER scaling over {len(df)} tweets (batch size {args.batch_size})")
+    print(f"{'Processes':>9} {'Seconds':>9} {'Tweets/sec':>11} {'Speedup':>9} Identical")
+    results = run_scaling(df, args.max_processes, args.batch_size)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"Tweets": len(df), "Batch Size": args.batch_size, "Results": results}, f, indent=4)
+        print(f"Scaling report saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
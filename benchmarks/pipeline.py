@@ -0,0 +1,202 @@
+'''
+End-to-end scaling benchmark for the whole pipeline.
+For every scale factor, generates a synthetic corpus (see benchmarks/synthetic.py) and times each stage of the
+hardcoded run on it in a fresh interpreter, so no scale inherits the memory of another.
+The peak memory of each stage is traced with tracemalloc (the peak is reset when the stage starts) in a second run, since
+tracing slows the stages down. The peak resident memory of the untraced run is reported too. Add '--no-memory' to skip tracing.
+The results are written as JSON, so two versions can be compared with '--baseline'.
+
+Run from the repository root, e.g.
+'python -m benchmarks.pipeline --scales 10000 100000 1000000 --output bench.json'
+'python -m benchmarks.pipeline --scales 10000 100000 1000000 --output new.json --baseline bench.json'
+'''
+import os
+import sys
+import json
+import time
+import resource
+import tracemalloc
+import argparse
+import tempfile
+import platform
+import subprocess
+from main import find_hosts, find_award_names, find_nominees, get_award_winner, get_award_presenters, process_red_carpet
+from util_functions.preprocessing_utils import preprocess_tweets
+from util_functions.corpus_utils import build_corpus, index_awards
+from util_functions.model_utils import get_nlp
+from benchmarks.synthetic import write_corpus
+
+# Stages in the order they run
+STAGES = ['preprocess_tweets', 'build_corpus', 'find_hosts', 'find_award_names', 'index_awards',
+          'find_nominees', 'get_award_winner', 'get_award_presenters', 'process_red_carpet']
+
+# A stage is reported as a regression if it got this much slower than in the baseline,
+# and by at least this many seconds (so timer noise on the fast stages is not reported)
+REGRESSION_RATIO = 1.2
+REGRESSION_MIN_SECONDS = 0.1
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def peak_memory_mb():
+    # Peak resident memory of this process so far (ru_maxrss is in KB on Linux, in bytes on macOS)
+    # This is the high-water mark of the whole process, so it is only reported once per run (see run_scale)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20) if sys.platform == 'darwin' else peak / (1 << 10)
+
+
+def run_pipeline(tweets_file, answers_file, trace_memory=True):
+    '''
+    Runs every stage of the hardcoded run over the corpus and times it. The per-award stages are summed over the awards.
+    With trace_memory, also records the peak memory each stage allocated on top of what was allocated before it started,
+    the largest over the awards for the per-award stages.
+
+    Example output:
+    {
+        "preprocess_tweets": {"Seconds": 4.2, "Peak Memory MB": 812.5},
+        ...
+    }
+    '''
+    with open(answers_file, 'r') as f:
+        award_names = list(json.load(f)['award_data'].keys())
+
+    stages = {stage: {"Seconds": 0.0} for stage in STAGES}
+    if trace_memory:
+        tracemalloc.start()
+
+    def timed(stage, function, *args):
+        if trace_memory:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        result = function(*args)
+        stages[stage]["Seconds"] += time.perf_counter() - start
+        if trace_memory:
+            peak = (tracemalloc.get_traced_memory()[1] - before) / (1 << 20)
+            stages[stage]["Peak Memory MB"] = max(stages[stage].get("Peak Memory MB", 0.0), peak)
+        return result
+
+    df = timed('preprocess_tweets', preprocess_tweets, tweets_file)
+    corpus = timed('build_corpus', build_corpus, df)
+    entities, token_index = corpus["entities"], corpus["tokens"]
+    host_names = [host[0] for host in timed('find_hosts', find_hosts, df, entities, token_index)]
+    timed('find_award_names', find_award_names, df, token_index)
+    timed('index_awards', index_awards, corpus, df, award_names)
+    for award in award_names:
+        nominees = timed('find_nominees', find_nominees, df, award, 6, entities, corpus["award_postings"])
+        timed('get_award_winner', get_award_winner, df, award, nominees)
+        timed('get_award_presenters', get_award_presenters, df, award, host_names, entities, corpus["presenter_postings"])
+    timed('process_red_carpet', process_red_carpet, df, entities, token_index)
+
+    if trace_memory:
+        tracemalloc.stop()
+    return stages
+
+
+def run_fresh(tweets_file, answers_file, trace_memory):
+    # Runs run_pipeline in a fresh interpreter, which prints its results as JSON on its last line
+    args = [sys.executable, '-m', 'benchmarks.pipeline', '--run', tweets_file, answers_file]
+    if not trace_memory:
+        args.append('--no-memory')
+    result = subprocess.run(args, capture_output=True, text=True, cwd=ROOT)
+    if result.returncode != 0:
+        print(result.stderr)
+        result.check_returncode()
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def run_scale(tweets_file, answers_file, trace_memory=True):
+    '''
+    Times run_pipeline in a fresh interpreter, and with trace_memory traces the memory of each stage in another one.
+    Returns the stages and the peak resident memory of the untraced interpreter.
+
+    Example output:
+    {"Stages": {"preprocess_tweets": {"Seconds": 4.2, "Peak Memory MB": 812.5}, ...}, "Process Peak Memory MB": 2310.4}
+    '''
+    run = run_fresh(tweets_file, answers_file, trace_memory=False)
+    if trace_memory:
+        traced = run_fresh(tweets_file, answers_file, trace_memory=True)
+        for stage, result in run["Stages"].items():
+            result["Peak Memory MB"] = traced["Stages"][stage]["Peak Memory MB"]
+    return run
+
+
+def git_commit():
+    # Commit the benchmark ran on, if this is a git checkout
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline):
+    '''
+    Returns the stages that got more than REGRESSION_RATIO times (and REGRESSION_MIN_SECONDS) slower than in the baseline,
+    at the scales both ran.
+    '''
+    baseline_runs = {run["Tweets"]: run for run in baseline["Runs"]}
+    regressions = []
+    for run in results["Runs"]:
+        if run["Tweets"] not in baseline_runs:
+            continue
+        for stage, result in run["Stages"].items():
+            before = baseline_runs[run["Tweets"]]["Stages"].get(stage)
+            if before and result["Seconds"] > before["Seconds"] * REGRESSION_RATIO and result["Seconds"] - before["Seconds"] > REGRESSION_MIN_SECONDS:
+                regressions.append({"Tweets": run["Tweets"], "Stage": stage, "Before": before["Seconds"], "After": result["Seconds"]})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time every pipeline stage on synthetic corpora of increasing size.")
+    parser.add_argument("--scales", type=int, nargs="+", default=[10000, 100000], help="corpus sizes in tweets, e.g. 10000 to 10000000")
+    parser.add_argument("--awards", type=int, default=26, help="number of awards of the synthetic ceremony")
+    parser.add_argument("--celebrities", type=int, default=500, help="number of celebrities of the synthetic ceremony")
+    parser.add_argument("--seed", type=int, default=0, help="random seed of the synthetic corpora")
+    parser.add_argument("--output", default=None, help="write the results as JSON to this file")
+    parser.add_argument("--baseline", default=None, help="results of an earlier run to report regressions against")
+    parser.add_argument("--no-memory", action="store_true", help="don't trace the memory of each stage (a second, slower run)")
+    parser.add_argument("--run", nargs=2, default=None, metavar=("TWEETS", "ANSWERS"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        # One scale, in the fresh interpreter started by run_scale
+        # Load the model up front so it isn't part of the first measurement
+        get_nlp()
+        stages = run_pipeline(*args.run, trace_memory=not args.no_memory)
+        print(json.dumps({"Stages": stages, "Process Peak Memory MB": peak_memory_mb()}))
+        return
+
+    results = {"Commit": git_commit(), "Python": platform.python_version(), "Runs": []}
+    for num_tweets in args.scales:
+        with tempfile.TemporaryDirectory() as data_dir:
+            print(f"Generating {num_tweets} tweets")
+            tweets_file, answers_file = write_corpus(num_tweets, 9999, data_dir, args.awards, args.celebrities, args.seed)
+            run = run_scale(tweets_file, answers_file, trace_memory=not args.no_memory)
+        stages = run["Stages"]
+        total = sum(stage["Seconds"] for stage in stages.values())
+        results["Runs"].append({"Tweets": num_tweets, "Awards": args.awards, "Total Seconds": total,
+                                "Process Peak Memory MB": run["Process Peak Memory MB"], "Stages": stages})
+
+        print(f"{num_tweets} tweets, {total:.2f} seconds, peak resident memory {run['Process Peak Memory MB']:.1f} MB")
+        print(f"{'Stage':<22} {'Seconds':>9} {'Peak MB':>9}")
+        for stage, result in stages.items():
+            peak = f"{result['Peak Memory MB']:>9.1f}" if "Peak Memory MB" in result else f"{'-':>9}"
+            print(f"{stage:<22} {result['Seconds']:>9.2f} {peak}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=4)
+        print(f"Pipeline benchmark saved to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            regressions = compare(results, json.load(f))
+        for regression in regressions:
+            print(f"Regression at {regression['Tweets']} tweets: {regression['Stage']} "
+                  f"{regression['Before']:.2f}s -> {regression['After']:.2f}s")
+        if not regressions:
+            print("No regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+'''
+Micro-benchmark for the winner and nominee regexes.
+Times, for every award, the regex pass over all tweets with the original per-call patterns (rebuilt and
+re-split for every tweet) and with the compiled, cached pattern bank, and checks both find the same names.
+
+Run from the repository root, e.g. 'python -m benchmarks.regex_bank 2013'
+'''
+import re
+import json
+import time
+import argparse
+from util_functions.preprocessing_utils import preprocess_tweets
+from util_functions.predictions_utils import extract_potential_winners, match_nominee_patterns, winner_patterns
+
+
+# Original implementation, kept here as the baseline
+def original_potential_winners(text, award):
+    just_variations = r'(?:(?:(?:she|he)\s+)?just\s+)?'
+    winner_patterns = [
+        r'(\w+(?:\s+\w+)?)\s+' + just_variations + r'wins\s+(?!' + award + ')',
+        r'(\w+(?:\s+\w+)?)\s+' + just_variations + r'won\s+(?!' + award + ')',
+        r'(\w+(?:\s+\w+)?)\s+' + just_variations + r'awarded\s+(?!' + award + ')',
+        r'(\w+(?:\s+\w+)?)\s+' + just_variations + r'awarded\s+to\s+(?!' + award + ')',
+        r'(\w+(?:\s+\w+)?)\s+' + just_variations + r'goes\s+(?!' + award + ')',
+        r'(\w+(?:\s+\w+)?)\s+' + just_variations + r'received\s+(?!' + award + ')',
+        r'(\w+(?:\s+\w+)?)\s+-\s+' + re.escape(award) + r'\s+-',
+    ]
+    winners = []
+    for pattern in winner_patterns:
+        stop_words = {'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'has', 'he', 'in', 'is', 'it',
+                     'its', 'of', 'on', 'that', 'the', 'to', 'was', 'were', 'will', 'with', 'the', 'this', 'but', 'they',
+                     'have', 'had', 'what', 'when', 'where', 'who', 'which', 'why', 'how'}
+        pattern_words = pattern.split()
+        pattern = ' '.join([word for word in pattern_words if word.lower() not in stop_words])
+        winners.extend(re.findall(pattern, text, re.IGNORECASE))
+    return winners
+
+
+# Original implementation, kept here as the baseline
+def original_nominee_patterns(text):
+    nominee_patterns = [
+        r'(\w+(?:\s+\w+)?)\s+is\s+nominated\s+for\s+',
+        r'(\w+(?:\s+\w+)?)\s+was\s+nominated\s+for\s+',
+        r'(\w+(?:\s+\w+)?)\s+has\s+been\s+nominated\s+for\s+',
+        r'nominee\s+(\w+(?:\s+\w+)?)\s+for\s+'
+    ]
+    nominees = []
+    for pattern in nominee_patterns:
+        nominees.extend(re.findall(pattern, text, re.IGNORECASE))
+    return nominees
+
+
+def time_pass(function, texts):
+    start = time.perf_counter()
+    results = [function(text) for text in texts]
+    return time.perf_counter() - start, results
+
+
+def run_benchmark(texts, award_names):
+    '''
+    Returns the winner regex timings per award and the nominee regex timings (which don't depend on the award).
+
+    Example output:
+    {
+        "Winners": [{"Award": "best director - motion picture", "Before": 2.31, "After": 0.12, "Speedup": 19.3, "Identical": True}, ...],
+        "Nominees": {"Before": 0.52, "After": 0.04, "Speedup": 13.0, "Identical": True}
+    }
+    '''
+    winner_results = []
+    print(f"{'Before':>8} {'After':>8} {'Speedup':>8} Identical Award")
+    for award in award_names:
+        winner_patterns.cache_clear()
+        before, expected = time_pass(lambda text: original_potential_winners(text, award), texts)
+        after, found = time_pass(lambda text: extract_potential_winners(text, award), texts)
+        winner_results.append({"Award": award, "Before": before, "After": after, "Speedup": before / after, "Identical": found == expected})
+        print(f"{before:>8.3f} {after:>8.3f} {before / after:>7.1f}x {str(found == expected):>9} {award}")
+
+    before, expected = time_pass(original_nominee_patterns, texts)
+    after, found = time_pass(match_nominee_patterns, texts)
+    nominee_results = {"Before": before, "After": after, "Speedup": before / after, "Identical": found == expected}
+    print(f"{before:>8.3f} {after:>8.3f} {before / after:>7.1f}x {str(found == expected):>9} (nominee patterns)")
+
+    return {"Winners": winner_results, "Nominees": nominee_results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the winner and nominee regexes per award, before and after the compiled pattern bank.")
+    parser.add_argument("year", nargs="?", type=int, default=2013, help="year of the ceremony, reads data/gg{year}.json and data/gg{year}answers.json")
+    parser.add_argument("--limit", type=int, default=None, help="only use the first LIMIT tweets")
+    parser.add_argument("--output", default=None, help="also write the results as JSON to this file")
+    args = parser.parse_args()
+
+    df = preprocess_tweets(f"data/gg{args.year}.json")
+    texts = df['clean_text'].tolist()[:args.limit]
+    with open(f"data/gg{args.year}answers.json", 'r') as f:
+        award_names = list(json.load(f)['award_data'].keys())
+
+    print(f"Regex time per award over {len(texts)} tweets (seconds)")
+    results = run_benchmark(texts, award_names)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"Tweets": len(texts), **results}, f, indent=4)
+        print(f"Regex benchmark saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
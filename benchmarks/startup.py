@@ -0,0 +1,91 @@
+'''
+Startup benchmark. Each measurement runs in a fresh interpreter, so nothing is already imported or loaded:
+- how long 'python main.py --help' takes,
+- how long 'import main' takes, and which heavy libraries it imports (spacy and nltk should only be imported on first use),
+- how long it takes from the start of the interpreter until the first stage (preprocessing the tweets) has finished.
+
+Run from the repository root, e.g. 'python -m benchmarks.startup 2013 --repeat 5'
+'''
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+MAIN = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'main.py')
+
+# Libraries that should not be imported until a stage needs them
+LAZY_LIBRARIES = ['spacy', 'nltk']
+
+IMPORT_SCRIPT = '''
+import sys, json, time
+start = time.perf_counter()
+import main
+seconds = time.perf_counter() - start
+print(json.dumps({"Seconds": seconds, "Imported": [name for name in %r if name in sys.modules]}))
+'''
+
+FIRST_STAGE_SCRIPT = '''
+import json, time
+start = time.perf_counter()
+from main import cached_preprocess_tweets, ANALYSIS_COLUMNS
+cached_preprocess_tweets("data/gg%d.json", columns=ANALYSIS_COLUMNS)
+print(json.dumps({"Seconds": time.perf_counter() - start}))
+'''
+
+
+def run_python(args):
+    # Wall time of a fresh interpreter running args, and the last line it printed
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable] + args, capture_output=True, text=True, check=True)
+    seconds = time.perf_counter() - start
+    lines = result.stdout.strip().splitlines()
+    return seconds, lines[-1] if lines else ""
+
+
+def run_startup(year, repeat):
+    '''
+    Returns the best of repeat runs of each measurement.
+
+    Example output:
+    {"Help Seconds": 0.55, "Import Seconds": 0.41, "First Stage Seconds": 1.2, "Imported Lazy Libraries": []}
+    '''
+    help_seconds = min(run_python([MAIN, '--help'])[0] for _ in range(repeat))
+
+    imports = [json.loads(run_python(['-c', IMPORT_SCRIPT % LAZY_LIBRARIES])[1]) for _ in range(repeat)]
+    # The first run also makes sure the preprocessed tweets are cached, as they are after the first real run
+    run_python(['-c', FIRST_STAGE_SCRIPT % year])
+    first_stage_seconds = min(json.loads(run_python(['-c', FIRST_STAGE_SCRIPT % year])[1])["Seconds"] for _ in range(repeat))
+
+    return {
+        "Help Seconds": help_seconds,
+        "Import Seconds": min(result["Seconds"] for result in imports),
+        "First Stage Seconds": first_stage_seconds,
+        "Imported Lazy Libraries": imports[0]["Imported"]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the startup of the program: --help, importing main and reaching the first stage.")
+    parser.add_argument("year", nargs="?", type=int, default=2013, help="year of the ceremony, reads data/gg{year}.json")
+    parser.add_argument("--repeat", type=int, default=3, help="number of runs of each measurement, the fastest is reported")
+    parser.add_argument("--output", default=None, help="also write the results as JSON to this file")
+    args = parser.parse_args()
+
+    result = run_startup(args.year, args.repeat)
+
+    print(f"main.py --help: {result['Help Seconds']:.2f}s")
+    print(f"import main: {result['Import Seconds']:.2f}s")
+    print(f"First stage (cached tweets) done after: {result['First Stage Seconds']:.2f}s")
+    if result["Imported Lazy Libraries"]:
+        print(f"Imported by 'import main', should be imported on first use: {', '.join(result['Imported Lazy Libraries'])}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=4)
+        print(f"Startup benchmark saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+'''
+Synthetic ceremony tweet generator, for benchmarking at corpus sizes we have no real data for.
+Writes data/gg{year}.json in the same schema as the real corpus, and data/gg{year}answers.json with the hosts
+and the presenters, nominees and winner of every award, so the output can be checked against it.
+
+Each award is announced at its own time during a three hour ceremony. Winner tweets burst right after the
+announcement, presenter tweets just before it, and a share of the tweets are retweets of earlier ones.
+
+Run from the repository root, e.g. 'python -m benchmarks.synthetic 1000000 --year 9999 --awards 26 --celebrities 500'
+'''
+import os
+import json
+import random
+import calendar
+import argparse
+
+FIRST_NAMES = ['Anne', 'Ben', 'Claire', 'Daniel', 'Emma', 'Frank', 'Grace', 'Hugh', 'Isla', 'Jack', 'Kate', 'Liam',
+               'Maya', 'Noah', 'Olivia', 'Paul', 'Quinn', 'Rachel', 'Sam', 'Tara', 'Uma', 'Victor', 'Wendy', 'Xavier',
+               'Yara', 'Zach', 'Amber', 'Bruno', 'Celia', 'Dev', 'Elena', 'Felix', 'Gina', 'Hector', 'Iris', 'Jonah']
+LAST_NAMES = ['Adler', 'Brooks', 'Castillo', 'Dawson', 'Ellison', 'Fischer', 'Garner', 'Hayes', 'Ingram', 'Jensen',
+              'Keller', 'Lawson', 'Mercer', 'Novak', 'Okafor', 'Porter', 'Quint', 'Ramirez', 'Sutton', 'Thornton',
+              'Underwood', 'Vance', 'Whitaker', 'Xu', 'Young', 'Zimmer', 'Abbott', 'Blake', 'Carver', 'Dunn']
+TITLE_ADJECTIVES = ['Silent', 'Golden', 'Broken', 'Hidden', 'Last', 'Crimson', 'Endless', 'Wild', 'Quiet', 'Distant',
+                    'Burning', 'Frozen', 'Hollow', 'Bright', 'Lonely', 'Secret']
+TITLE_NOUNS = ['Harbor', 'Kingdom', 'River', 'Empire', 'Garden', 'Signal', 'Frontier', 'Winter', 'Summer', 'Machine',
+               'Letter', 'Horizon', 'Mountain', 'Station', 'Archive', 'Promise']
+
+ROLES = ['actor', 'actress']
+MEDIA = ['motion picture', 'television series', 'mini-series or motion picture made for television']
+GENRES = ['drama', 'comedy or musical']
+SUPPORTING_MEDIA = ['motion picture', 'series, mini-series or motion picture made for television']
+WORK_AWARDS = ['best motion picture - drama', 'best motion picture - comedy or musical', 'best animated feature film',
+               'best foreign language film', 'best screenplay - motion picture', 'best original score - motion picture',
+               'best original song - motion picture', 'best television series - drama',
+               'best television series - comedy or musical', 'best mini-series or motion picture made for television']
+
+# Share of each kind of tweet
+TWEET_KINDS = {
+    "win": 0.25,
+    "nominee": 0.1,
+    "present": 0.1,
+    "host": 0.08,
+    "dressed": 0.1,
+    "retweet": 0.25,
+    "noise": 0.12
+}
+
+TEMPLATES = {
+    "win": ["{winner} wins {award}!", "{Award} goes to {winner} #GoldenGlobes", "And the winner of {award} is {winner}",
+            "{winner} won {award} http://t.co/{code}", "Congrats to {winner}, {award} winner! #GoldenGlobes"],
+    "nominee": ["{nominee} is nominated for {award}", "{nominee} nominated for {award} #GoldenGlobes",
+                "So happy {nominee} was nominated for {award}"],
+    "present": ["{presenter} and {other_presenter} presenting {award}", "{presenter} presents {award}",
+                "{presenter} is presenting {award} #GoldenGlobes"],
+    "host": ["{host} and {other_host} host the Golden Globes", "{host} is hosting tonight, so funny",
+             "Loving the hosts {host} and {other_host}"],
+    "dressed": ["{person} looks amazing, best dressed tonight", "{person} dressed horribly, awful outfit",
+                "Loving the dress {person} is wearing", "What is {person} wearing? Worst outfit of the night"],
+    "noise": ["Watching the Golden Globes with friends", "Commercial break already?", "#GoldenGlobes tonight!!",
+              "This ceremony is taking forever", "Who else is watching? http://t.co/{code}"]
+}
+
+# Start of the ceremony (ms since epoch, relative to January 1st of the year) and its length
+CEREMONY_START = 13 * 24 * 3600 * 1000 + 3600 * 1000
+CEREMONY_LENGTH = 3 * 3600 * 1000
+
+
+def award_names(num_awards):
+    # Person awards first (actor/actress in each medium and genre, supporting roles, then director), then the awards for works
+    names = [f"best performance by an {role} in a {medium} - {genre}" for medium in MEDIA for genre in GENRES for role in ROLES]
+    names += [f"best performance by an {role} in a supporting role in a {medium}" for medium in SUPPORTING_MEDIA for role in ROLES]
+    names += ['best director - motion picture'] + WORK_AWARDS
+    if num_awards > len(names):
+        raise ValueError(f"At most {len(names)} awards can be generated")
+    return names[:num_awards]
+
+
+def is_person_award(award):
+    # Same test extract_all_nominees uses
+    return any(keyword in award for keyword in ['actor', 'actress', 'performance', 'director'])
+
+
+def build_ceremony(year, num_awards, num_celebrities, rng):
+    '''
+    Draws the celebrities, works, hosts and, for every award, its announcement time, presenters, nominees and winner.
+    '''
+    people = [f"{first} {last}" for first in FIRST_NAMES for last in LAST_NAMES]
+    works = [f"The {adjective} {noun}" for adjective in TITLE_ADJECTIVES for noun in TITLE_NOUNS]
+    if num_celebrities > len(people):
+        raise ValueError(f"At most {len(people)} celebrities can be generated")
+    celebrities = rng.sample(people, num_celebrities)
+
+    start = calendar.timegm((year, 1, 1, 0, 0, 0)) * 1000 + CEREMONY_START
+    names = award_names(num_awards)
+    awards = {}
+    for index, award in enumerate(names):
+        pool = celebrities if is_person_award(award) else works
+        nominees = rng.sample(pool, 5)
+        awards[award] = {
+            "time": start + (index + 1) * CEREMONY_LENGTH // (len(names) + 1),
+            "presenters": rng.sample(celebrities, 2),
+            "nominees": nominees,
+            "winner": nominees[0]
+        }
+
+    return {
+        "start": start,
+        "hosts": rng.sample(celebrities, 2),
+        "celebrities": celebrities,
+        "awards": awards
+    }
+
+
+def tweet_text(kind, ceremony, rng):
+    # Returns the text of a tweet of the given kind and the time it is tweeted at
+    award = rng.choice(list(ceremony["awards"]))
+    info = ceremony["awards"][award]
+    if kind == "win":
+        time = info["time"] + int(rng.expovariate(1 / 60000))
+    elif kind == "present":
+        time = info["time"] - int(rng.expovariate(1 / 90000))
+    else:
+        time = ceremony["start"] + rng.randrange(CEREMONY_LENGTH)
+
+    host, other_host = ceremony["hosts"]
+    presenter, other_presenter = info["presenters"]
+    text = rng.choice(TEMPLATES[kind]).format(
+        award=award, Award=award.title(), winner=info["winner"], nominee=rng.choice(info["nominees"]),
+        presenter=presenter, other_presenter=other_presenter, host=host, other_host=other_host,
+        person=rng.choice(ceremony["celebrities"]), code=f"{rng.randrange(36 ** 6):06x}"
+    )
+    return text, time
+
+
+def generate_tweets(num_tweets, ceremony, rng):
+    '''
+    Yields num_tweets tweets as dicts in the gg{year}.json schema.
+    '''
+    kinds, weights = list(TWEET_KINDS), list(TWEET_KINDS.values())
+    num_users = max(1, num_tweets // 10)
+    recent = []
+    for i in range(num_tweets):
+        kind = rng.choices(kinds, weights)[0]
+        if kind == "retweet" and recent:
+            screen_name, text, time = rng.choice(recent)
+            text = f"RT @{screen_name}: {text}"
+            time += int(rng.expovariate(1 / 30000))
+        else:
+            text, time = tweet_text("noise" if kind == "retweet" else kind, ceremony, rng)
+
+        user_id = rng.randrange(num_users)
+        screen_name = f"user{user_id}"
+        # Keep a window of recent tweets to retweet
+        if len(recent) < 1000:
+            recent.append((screen_name, text, time))
+        else:
+            recent[rng.randrange(1000)] = (screen_name, text, time)
+
+        yield {
+            "text": text,
+            "user": {"screen_name": screen_name, "id": user_id},
+            "id": 290000000000000000 + i,
+            "timestamp_ms": time
+        }
+
+
+def write_corpus(num_tweets, year, data_dir="data", num_awards=26, num_celebrities=500, seed=0):
+    '''
+    Writes a synthetic data/gg{year}.json and data/gg{year}answers.json. The tweets are written as they are generated,
+    so corpora much larger than memory can be generated. Returns the paths of the two files.
+    '''
+    rng = random.Random(seed)
+    ceremony = build_ceremony(year, num_awards, num_celebrities, rng)
+    os.makedirs(data_dir, exist_ok=True)
+
+    tweets_file = os.path.join(data_dir, f"gg{year}.json")
+    with open(tweets_file, 'w') as f:
+        f.write('[')
+        for i, tweet in enumerate(generate_tweets(num_tweets, ceremony, rng)):
+            if i:
+                f.write(', ')
+            f.write(json.dumps(tweet))
+        f.write(']')
+
+    answers_file = os.path.join(data_dir, f"gg{year}answers.json")
+    answers = {
+        "hosts": [host.lower() for host in ceremony["hosts"]],
+        "award_data": {
+            award: {
+                "nominees": [nominee.lower() for nominee in info["nominees"]],
+                "presenters": [presenter.lower() for presenter in info["presenters"]],
+                "winner": info["winner"].lower()
+            } for award, info in ceremony["awards"].items()
+        }
+    }
+    with open(answers_file, 'w') as f:
+        json.dump(answers, f, indent=4)
+
+    return tweets_file, answers_file
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic Golden Globes tweet corpus and its answers.")
+    parser.add_argument("tweets", type=int, help="number of tweets, e.g. 10000 to 10000000")
+    parser.add_argument("--year", type=int, default=9999, help="writes data/gg{year}.json and data/gg{year}answers.json")
+    parser.add_argument("--data-dir", default="data", help="directory to write the files to")
+    parser.add_argument("--awards", type=int, default=26, help="number of awards")
+    parser.add_argument("--celebrities", type=int, default=500, help="number of celebrities")
+    parser.add_argument("--seed", type=int, default=0, help="random seed, the same seed gives the same corpus")
+    args = parser.parse_args()
+
+    tweets_file, answers_file = write_corpus(args.tweets, args.year, args.data_dir, args.awards, args.celebrities, args.seed)
+    print(f"Wrote {args.tweets} tweets to {tweets_file} and the answers to {answers_file}")
+
+
+if __name__ == "__main__":
+    main()
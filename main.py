@@ -1,11 +1,20 @@
 import os
 import json
-import sys
-import pandas as pd
-from util_functions.preprocessing_utils import preprocess_tweets
-from util_functions.predictions_utils import extract_winners, extract_all_hosts, extract_all_award_names, extract_all_nominees, extract_all_presenters
+import time
+import argparse
+from util_functions.preprocessing_utils import ingest_tweets, load_tweet_store, dedup_tweets, tweet_weights, ANALYSIS_COLUMNS
+from util_functions.cache_utils import cached_preprocess_tweets, cached_stage, corpus_fingerprint, open_stage_cache, STAGE_CACHE_MAX_BYTES
+from util_functions.predictions_utils import extract_winners, extract_all_award_names, extract_all_nominees, filter_host_tweets, filter_presenter_tweets, rank_winners, nominee_label
 from util_functions.aggregation_utils import aggregate_entities, named_entity_recognition, is_person_name
+from util_functions.entity_utils import tweet_entities, count_entities, NER_BATCH_SIZE
+from util_functions.fuzzy_utils import merge_contained_names
+from util_functions.corpus_utils import build_corpus, index_awards
 from util_functions.sentiment_analysis_utils import analyze_best_worst_dressed
+from util_functions.model_utils import format_load_stats, get_load_stats, get_nlp, get_model_versions, set_entity_backend, use_gazetteer_rules, ENTITY_BACKENDS
+from util_functions.scheduling_utils import map_ordered, open_pool, EXECUTORS
+from util_functions.gazetteer_utils import build_gazetteer, index_gazetteer, validate_candidates
+from util_functions.live_utils import tail_tweets, new_live_counts, update_live_counts, ranked_entities
+from util_functions.profile_utils import stage, enable_profiling, format_profile_summary, save_profile
 
 def import_data():
     with open("data/gg2013answers.json", 'r') as f:
@@ -15,16 +24,28 @@ def import_data():
 
     return hosts, award_data
 
-def find_hosts(df):
+def find_hosts(df, entities=None, token_index=None):
     """
     Find hosts for the entire ceremony.
+    If the corpus entity table is given, host entities are looked up there instead of running NER again.
+    If the token index is given, host tweets are found through it instead of scanning every tweet.
     """
     # Define entity list of people which host could come from
     # _, people_entities = define_entities(year)
 
-    hosts_tweets = extract_all_hosts(df)
-    hosts_entities = named_entity_recognition(hosts_tweets)
+    if entities is not None:
+        # select_hosts only looks at the top 50 candidates (see aggregate_entities)
+        hosts_entities = count_entities(tweet_entities(entities, filter_host_tweets(df, token_index)['id'], 'PERSON'), top_n=50)
+    else:
+        hosts_tweets = filter_host_tweets(df)
+        hosts_entities = named_entity_recognition(hosts_tweets['cleaned_text'].tolist(), counts=tweet_weights(hosts_tweets))
+
+    return select_hosts(hosts_entities)
 
+def select_hosts(hosts_entities):
+    """
+    Picks the hosts from the host candidates, a list of {"Name", "Number of Tweets"} sorted by number of tweets.
+    """
     hosts_entities = aggregate_entities(hosts_entities)
 
     # Calculate the mean and standard deviation of the counts
@@ -46,16 +67,7 @@ def find_hosts(df):
     significant_hosts.sort(key=lambda x: x[1], reverse=True) 
 
     # Process each host entry to merge partial names with full names
-    host_counts = {}
-    for name, count in significant_hosts:
-        added = False
-        for existing_name in list(host_counts.keys()):
-            if name in existing_name or existing_name in name:
-                host_counts[existing_name] += count
-                added = True
-                break
-        if not added:
-            host_counts[name] = host_counts.get(name, 0) + count
+    host_counts = merge_contained_names(significant_hosts)
 
     # Sort the hosts by count in descending order
     sorted_hosts = sorted(host_counts.items(), key=lambda x: x[1], reverse=True)
@@ -72,13 +84,16 @@ def find_hosts(df):
     
     # return significant_hosts
 
-def find_nominees(df, award, top_n):
+def find_nominees(df, award, top_n, entities=None, postings=None, window=None, known_names=None):
     # takes in the preprocessed df and hard-coded list of awards
     #top_nominees_by_award = []
     #for award in awards:
-    award_nominees = extract_all_nominees(df, award)
-    # Get the top 6 nominees
+    award_nominees = extract_all_nominees(df, award, entities, postings, window)
     nominees = award_nominees["Nominees"]
+    # Keep the nominees the gazetteer knows (see index_gazetteer). The winner is picked among them, so it is validated too.
+    if known_names is not None:
+        nominees = validate_candidates(nominees, known_names[nominee_label(award)])
+    # Get the top 6 nominees
     nominee_names = [nominee["Name"] for nominee in nominees]
     top_nominees = nominee_names[:top_n]
     # Store the result in the list
@@ -88,9 +103,9 @@ def find_nominees(df, award, top_n):
     })'''
     return top_nominees
     
-def find_award_names(df):
+def find_award_names(df, token_index=None):
     
-    award_names = extract_all_award_names(df)
+    award_names = extract_all_award_names(df, token_index)
 
     # Calculate the mean and standard deviation of the counts
     counts = [award['Number of Tweets'] for award in award_names]
@@ -114,9 +129,13 @@ def find_award_names(df):
 
     return award_names
 
-def get_award_winner(df, award, nominees):
-    potential_award_winners = extract_winners(df, award, nominees)
+def get_award_winner(df, award, nominees, window=None):
+    potential_award_winners = extract_winners(df, award, nominees, window)
+
+    return select_winner(potential_award_winners, nominees)
 
+def select_winner(potential_award_winners, nominees):
+    # Picks the winner from the output of extract_winners
     candidate_dict = {winner["Name"]: winner["Number of Tweets"] for winner in potential_award_winners["Winners"]}
     candidate_dict = dict(sorted(candidate_dict.items(), key=lambda item: item[1], reverse=True))
 
@@ -137,13 +156,23 @@ def get_award_winner(df, award, nominees):
 
     return winner
 
-def get_award_presenters(df, award_name, hosts):
-    presenters = extract_all_presenters(df, award_name)
-    presenters_entities = named_entity_recognition(presenters)
+def get_award_presenters(df, award_name, hosts, entities=None, postings=None, window=None):
+    if entities is not None:
+        # The entity table already knows which names are person names on their own
+        presenters = tweet_entities(entities, filter_presenter_tweets(df, award_name, postings, window=window)['id'], 'PERSON')
+        # Hosts are left out by id, and only the top 3 presenters are ranked (see select_presenters)
+        presenters_entities = count_entities(presenters[presenters['is_person']], top_n=3, exclude=hosts)
+    else:
+        presenters = filter_presenter_tweets(df, award_name, postings, window=window)
+        presenters_entities = named_entity_recognition(presenters['cleaned_text'].tolist(), counts=tweet_weights(presenters))
+
+        # Filter out non-person names
+        presenters_entities = [entity for entity in presenters_entities if is_person_name(entity['Name'])]
 
-    # Filter out non-person names
-    presenters_entities = [entity for entity in presenters_entities if is_person_name(entity['Name'])]
+    return select_presenters(presenters_entities, hosts)
 
+def select_presenters(presenters_entities, hosts):
+    # Picks the presenters from the presenter candidates, a list of {"Name", "Number of Tweets"}
     # Filter out hosts
     presenters_entities = [presenter for presenter in presenters_entities if presenter['Name'] not in hosts]
 
@@ -153,35 +182,76 @@ def get_award_presenters(df, award_name, hosts):
     return presenters_entities
 
 
+# Function to find the presenters, nominees and winner of a single award
+# Awards are independent of each other and only read df, so several can be processed at once (see process_awards)
+# If award_windows is given, only the tweets inside the award's window of time are used (see index_awards)
+# If known_names is given, only known people and films are nominated (see index_gazetteer)
+def process_award(df, host_names, entities, award_postings, presenter_postings, award_windows, known_names, stage_cache, award_name):
+    print(f"Processing Award: {award_name}")
+    window = award_windows.get(award_name) if award_windows else None
+    with stage("process_award", award=award_name):
+        # The answers only depend on the award, the hosts and the window, so both modes share them through the stage cache
+        return cached_stage(stage_cache, "process_award", {"award": award_name, "hosts": host_names, "window": window},
+                            find_award_answers, df, award_name, host_names, entities, award_postings, presenter_postings, window, known_names)
+
+# Function to find the presenters, nominees and winner of one award
+def find_award_answers(df, award_name, host_names, entities, award_postings, presenter_postings, window, known_names):
+    # Presenters
+    with stage("get_award_presenters"):
+        award_presenters = get_award_presenters(df, award_name, host_names, entities, presenter_postings, window)
+    presenter_names = [presenter['Name'] for presenter in award_presenters]
+    # Nominees
+    with stage("find_nominees"):
+        nominee_names = find_nominees(df, award_name, 6, entities, award_postings, window, known_names)
+    # Winner
+    with stage("get_award_winner"):
+        winner = get_award_winner(df, award_name, nominee_names, window)
+    return presenter_names, nominee_names, winner
+
 # Function to process awards given award names and host names
-def process_awards(df, award_names, host_names):
+# With workers > 1 the awards are processed on a pool of that many threads or processes (executor is "thread" or "process").
+# The output is the same, in the same order, whatever the number of workers.
+# With time_windows, each award is only searched for in the window of time when it was announced (needs the corpus).
+# pool is a thread pool shared across calls (see open_pool), used instead of starting one
+def process_awards(df, award_names, host_names, corpus=None, workers=1, executor="thread", time_windows=False, pool=None):
+    entities, award_postings, presenter_postings, award_windows, known_names, stage_cache = None, None, None, None, None, None
+    if corpus:
+        # Find the tweets mentioning each award in one pass, instead of rescanning every tweet for every award
+        with stage("index_awards"):
+            index_awards(corpus, df, award_names, time_windows)
+        entities = corpus["entities"]
+        award_postings = corpus["award_postings"]
+        presenter_postings = corpus["presenter_postings"]
+        award_windows = corpus.get("award_windows")
+        known_names = corpus.get("known_names")
+        stage_cache = corpus.get("stage_cache")
     human_readable_output = ""
     json_output = {"award_data": {}}
+    shared_args = (df, host_names, entities, award_postings, presenter_postings, award_windows, known_names, stage_cache)
+    results = map_ordered(process_award, award_names, shared_args, workers=workers, executor=executor, pool=pool)
     # Loop through awards
-    for award_name in award_names:
-        print(f"Processing Award: {award_name}")
-        # Presenters
-        award_presenters = get_award_presenters(df, award_name, host_names)
-        presenter_names = [presenter['Name'] for presenter in award_presenters]
-        # Nominees
-        nominee_names = find_nominees(df, award_name, 6)
-        # Winner
-        winner = get_award_winner(df, award_name, nominee_names)
+    for award_name, (presenter_names, nominee_names, winner) in zip(award_names, results):
         # Format for output
-        human_readable_output += (
-            f"Award: {award_name}\nPresenters: {', '.join(presenter_names)}\n"
-            f"Nominees: {', '.join(nominee_names)}\nWinner: {winner}\n\n"
-        )
-        json_output["award_data"][award_name] = {
-            "Presenters": presenter_names,
-            "Nominees": nominee_names,
-            "Winner": winner
-        }
+        award_text, json_output["award_data"][award_name] = format_award(award_name, presenter_names, nominee_names, winner)
+        human_readable_output += award_text
+    return human_readable_output, json_output
+
+# Function to format the answers for one award, as human-readable text and as json
+def format_award(award_name, presenter_names, nominee_names, winner):
+    human_readable_output = (
+        f"Award: {award_name}\nPresenters: {', '.join(presenter_names)}\n"
+        f"Nominees: {', '.join(nominee_names)}\nWinner: {winner}\n\n"
+    )
+    json_output = {
+        "Presenters": presenter_names,
+        "Nominees": nominee_names,
+        "Winner": winner
+    }
     return human_readable_output, json_output
 
 # Function to deal with extra task
-def process_red_carpet(df):
-    red_carpet_results = analyze_best_worst_dressed(df)
+def process_red_carpet(df, entities=None, token_index=None):
+    red_carpet_results = analyze_best_worst_dressed(df, entities, token_index)
     # Extract only the names
     best_dressed_names = [person["Name"] for person in red_carpet_results["Best Dressed"]]
     worst_dressed_names = [person["Name"] for person in red_carpet_results["Worst Dressed"]]
@@ -195,9 +265,9 @@ def process_red_carpet(df):
     return human_readable_output
 
 # Funtion to save JSON and human-readable outputs to respective files."""
-def save_output_files(json_output, human_output, file_prefix):
-    json_file = f"output/{file_prefix}_answers.json"
-    human_file = f"output/{file_prefix}_output.txt"
+def save_output_files(json_output, human_output, file_prefix, output_dir="output"):
+    json_file = f"{output_dir}/{file_prefix}_answers.json"
+    human_file = f"{output_dir}/{file_prefix}_output.txt"
     # Write JSON output
     with open(json_file, 'w') as f:
         json.dump(json_output, f, indent=4)
@@ -210,56 +280,182 @@ def save_output_files(json_output, human_output, file_prefix):
 # Function to use a hardcoded list of the awards and nominees to avoid cascading error
 '''This function DOES NOT output award names found by us. To see the answers with our
 generated award names included, must use the cascading_output function''' 
-def hardcoded_output(df, hardcoded_award_names):
+def hardcoded_output(df, hardcoded_award_names, corpus=None, award_workers=1, award_executor="thread", time_windows=False,
+                     red_carpet_df=None, output_dir="output", pool=None):
+    entities = corpus["entities"] if corpus else None
+    token_index = corpus["tokens"] if corpus else None
+    stage_cache = corpus.get("stage_cache") if corpus else None
     print("Using hardcoded list of awards to avoid cascading error")
     # Hosts
     print("Processing Hosts")
-    hosts = find_hosts(df)
+    with stage("find_hosts"):
+        hosts = cached_stage(stage_cache, "find_hosts", {}, find_hosts, df, entities, token_index)
     host_names = [host[0] for host in hosts]
     # Format outputs
     human_readable_output = "Hosts: " + ", ".join(host_names) + "\n\n"
     json_output = {"hosts": host_names}
     # Awards
-    award_text, award_json = process_awards(df, hardcoded_award_names, host_names)
+    with stage("process_awards"):
+        award_text, award_json = process_awards(df, hardcoded_award_names, host_names, corpus, award_workers, award_executor, time_windows, pool)
     # Add to outputs
     human_readable_output += award_text
     json_output.update(award_json)
     # Red Carpet
-    human_readable_output += process_red_carpet(df)
+    with stage("process_red_carpet"):
+        human_readable_output += cached_stage(stage_cache, "process_red_carpet", {}, process_red_carpet,
+                                              red_carpet_df if red_carpet_df is not None else df, entities, token_index)
     # Output
-    save_output_files(json_output, human_readable_output, "hardcoded")
+    with stage("save_output_files"):
+        save_output_files(json_output, human_readable_output, "hardcoded", output_dir)
     print(f"Human-readable format:\n{human_readable_output}")
     print(f"JSON format:\n{json.dumps(json_output, indent=4)}")
 
 # Function to use our generated list of the awards and nominees to view effects of cascading error
-def cascading_output(df):
+def cascading_output(df, corpus=None, award_workers=1, award_executor="thread", time_windows=False, red_carpet_df=None,
+                     output_dir="output", pool=None):
+    entities = corpus["entities"] if corpus else None
+    token_index = corpus["tokens"] if corpus else None
+    stage_cache = corpus.get("stage_cache") if corpus else None
     print("Not using any hardcoded lists, might result in cascading error")
     # Hosts
     print("Processing Hosts")
-    hosts = find_hosts(df)
+    with stage("find_hosts"):
+        hosts = cached_stage(stage_cache, "find_hosts", {}, find_hosts, df, entities, token_index)
     host_names = [host[0] for host in hosts]
     # Format outputs
     human_readable_output = "Hosts: " + ", ".join(host_names) + "\n\n"
     json_output = {"hosts": host_names}
     # Awards
     print("Extracting Awards")
-    awards = find_award_names(df)
+    with stage("find_award_names"):
+        awards = cached_stage(stage_cache, "find_award_names", {}, find_award_names, df, token_index)
     award_names = list(set([award['Name'] for award in awards]))
-    award_text, award_json = process_awards(df, award_names, host_names)
+    with stage("process_awards"):
+        award_text, award_json = process_awards(df, award_names, host_names, corpus, award_workers, award_executor, time_windows, pool)
     # Add to outputs
     human_readable_output += award_text
     json_output.update(award_json)
     # Red carpet
-    human_readable_output += process_red_carpet(df)
+    with stage("process_red_carpet"):
+        human_readable_output += cached_stage(stage_cache, "process_red_carpet", {}, process_red_carpet,
+                                              red_carpet_df if red_carpet_df is not None else df, entities, token_index)
     # Output
-    save_output_files(json_output, human_readable_output, "cascading")
+    with stage("save_output_files"):
+        save_output_files(json_output, human_readable_output, "cascading", output_dir)
     print(f"Human-readable format:\n{human_readable_output}")
     print(f"JSON format:\n{json.dumps(json_output, indent=4)}")
 
+# Function to build the answers from the running counts of live mode
+def live_answers(counts, award_names):
+    hosts = select_hosts(ranked_entities(counts["Hosts"])) if counts["Hosts"] else []
+    host_names = [host[0] for host in hosts]
+    human_readable_output = "Hosts: " + ", ".join(host_names) + "\n\n"
+    json_output = {"hosts": host_names, "award_data": {}}
+    for award_name in award_names:
+        presenter_names = [presenter['Name'] for presenter in select_presenters(ranked_entities(counts["Presenters"][award_name]), host_names)]
+        nominee_names = [nominee['Name'] for nominee in ranked_entities(counts["Nominees"][award_name])][:6]
+        winner = select_winner(rank_winners(award_name, counts["Winners"][award_name], nominee_names), nominee_names)
+        award_text, json_output["award_data"][award_name] = format_award(award_name, presenter_names, nominee_names, winner)
+        human_readable_output += award_text
+    return human_readable_output, json_output
+
+# Function to follow a line-delimited tweet file while the ceremony is on and keep the answers up to date
+# Only new tweets are processed. The answers are saved every interval seconds, as output/live_answers.json and output/live_output.txt.
+# Stops on Ctrl-C, or once no new tweets arrived for max_idle seconds.
+def live_output(filename, award_names, interval=60, poll_interval=1.0, max_idle=None, ner_batch_size=NER_BATCH_SIZE):
+    print(f"Following {filename}")
+    counts = new_live_counts(award_names)
+    next_save = time.monotonic() + interval
+    try:
+        for tweets in tail_tweets(filename, poll_interval, max_idle):
+            update_live_counts(counts, tweets, award_names, ner_batch_size)
+            if time.monotonic() >= next_save:
+                human_readable_output, json_output = live_answers(counts, award_names)
+                save_output_files(json_output, human_readable_output, "live")
+                print(f"Live answers updated after {counts['Tweets']} tweets")
+                next_save = time.monotonic() + interval
+    except KeyboardInterrupt:
+        print("Stopping live mode")
+    human_readable_output, json_output = live_answers(counts, award_names)
+    save_output_files(json_output, human_readable_output, "live")
+    print(f"Human-readable format:\n{human_readable_output}")
+
+# Function to preprocess a year's tweets and build its corpus, shared by every mode (see main and run_batch)
+# Returns the tweets for the NLP stages (deduplicated with dedup), every tweet for the red carpet, and the corpus
+# With stage_cache, the stage results are cached in cache/stages/ (see cached_stage) so other modes and later runs reuse them
+def prepare_corpus(year, ner_processes=1, ner_batch_size=NER_BATCH_SIZE, stream=False, chunk_size=100000, preprocess_workers=1,
+                   refresh_cache=False, dedup=False, gazetteer=False, entity_backend="lg", stage_cache=False,
+                   stage_cache_size=STAGE_CACHE_MAX_BYTES):
+    # Start from the plain backend, a previous year may have switched to its own gazetteer rules
+    set_entity_backend(entity_backend)
+    with stage("preprocess_tweets"):
+        if stream:
+            store = ingest_tweets(f"data/gg{year}.json", f"data/gg{year}_store", chunk_size)
+            df = load_tweet_store(store, columns=ANALYSIS_COLUMNS)
+        else:
+            df = cached_preprocess_tweets(f"data/gg{year}.json", workers=preprocess_workers, refresh=refresh_cache, columns=ANALYSIS_COLUMNS)
+    # The red carpet analysis does its own deduplication, so it always gets every tweet
+    red_carpet_df = df
+    if dedup:
+        # Parse every distinct text once. The counters count each text as many times as it was tweeted.
+        with stage("dedup_tweets"):
+            df = dedup_tweets(df)
+        print(f"Deduplicated {len(red_carpet_df)} tweets to {len(df)} distinct texts")
+    if gazetteer:
+        # The ceremony honours the films released the year before
+        with stage("build_gazetteer"):
+            known_entities = build_gazetteer(year - 1)
+        if entity_backend == "rules":
+            # The rule-based extractor also recognizes the year's known people and films, in a pipeline of its own
+            use_gazetteer_rules(year, known_entities["names"])
+    # Run NER once over the whole corpus. Every stage queries these results instead of running spacy itself.
+    with stage("build_corpus"):
+        corpus = build_corpus(df, ner_processes=ner_processes, ner_batch_size=ner_batch_size)
+    if gazetteer:
+        # Mark the mentions of known people and films once, the award stages validate their nominees against them
+        with stage("index_gazetteer"):
+            index_gazetteer(corpus, df, known_entities)
+    if stage_cache:
+        # The stage results only depend on the tweets, the code, the options the corpus was built with
+        # and the installed spacy and model, so upgrading the model does not serve the entities of the old one
+        fingerprint = corpus_fingerprint(f"data/gg{year}.json", dedup=dedup, gazetteer=gazetteer, entity_backend=entity_backend,
+                                         **get_model_versions())
+        corpus["stage_cache"] = open_stage_cache(fingerprint, max_bytes=stage_cache_size, refresh=refresh_cache)
+    return df, red_carpet_df, corpus
+
 # To call main, use command 'python main.py {year} {bool}'
 # e.g. 'python main.py 2013 True' calls main with 2013 data and hardcoded award names
-def main(year, use_hardcoded=False):
-    df = preprocess_tweets(f"data/gg{year}.json")
+# Add '--ner-processes N' to spread NER across N CPU cores, e.g. 'python main.py 2013 True --ner-processes 8'
+# Add '--stream' to read the tweets in chunks into an on-disk store first, for files too large to parse at once
+# (only ingestion is memory-bounded, the analysis columns are then loaded back into memory)
+# Add '--preprocess-workers N' to preprocess the tweets on N processes
+# The preprocessed tweets are cached in cache/, add '--refresh-cache' to preprocess them again anyway
+# Add '--award-workers N' to process N awards at once, on threads or with '--award-executor process' on processes
+# Add '--time-windows' to only search for each award in the few minutes when it was announced
+# Add '--dedup' to collapse identical copies of a text (e.g. the retweets of one tweet) into one weighted tweet before the NLP stages
+# Add '--gazetteer' to only nominate people and films of the year's movie dataset (see compile_movie_store)
+# Add '--entity-backend sm' or '--entity-backend rules' to extract entities faster, but less accurately, than with en_core_web_lg
+# Add '--profile' to print how long each stage took and write the trace to output/profile.json
+# Add '--years 2013 2015 --modes hardcoded cascading' to process several years and modes in one run (see run_batch)
+# Add '--stage-cache' to cache the hosts, awards and red carpet in cache/stages/, so other modes and later runs reuse them
+# Add '--live FILE' to follow a line-delimited tweet file during the ceremony, with the award names from data/gg{year}answers.json
+def main(year, use_hardcoded=False, ner_processes=1, ner_batch_size=NER_BATCH_SIZE, stream=False, chunk_size=100000,
+         preprocess_workers=1, refresh_cache=False, award_workers=1, award_executor="thread",
+         live=None, live_interval=60, live_idle_timeout=None, time_windows=False, dedup=False, profile=None, gazetteer=False, entity_backend="lg",
+         stage_cache=False, stage_cache_size=STAGE_CACHE_MAX_BYTES):
+    if profile:
+        enable_profiling()
+    set_entity_backend(entity_backend)
+    if live:
+        # The awards are known before the ceremony, so live mode always uses the hardcoded award names
+        with open(f"data/gg{year}answers.json", 'r') as f:
+            award_names = list(json.load(f)['award_data'].keys())
+        os.makedirs("output", exist_ok=True)
+        live_output(live, award_names, live_interval, max_idle=live_idle_timeout, ner_batch_size=ner_batch_size)
+        print(f"Model loading:\n{format_load_stats()}")
+        return
+    df, red_carpet_df, corpus = prepare_corpus(year, ner_processes, ner_batch_size, stream, chunk_size, preprocess_workers,
+                                               refresh_cache, dedup, gazetteer, entity_backend, stage_cache, stage_cache_size)
     os.makedirs("output", exist_ok=True)
     # If use_hardcoded, use the hardcoded award names to prevent cascading error
     if use_hardcoded:
@@ -268,20 +464,117 @@ def main(year, use_hardcoded=False):
             answers_data = json.load(f)
         hardcoded_awards_data = answers_data['award_data']
         hardcoded_award_names = list(hardcoded_awards_data.keys())
-        hardcoded_output(df, hardcoded_award_names)
+        hardcoded_output(df, hardcoded_award_names, corpus, award_workers, award_executor, time_windows, red_carpet_df)
     # If nothing specified, use our raw implementation for everything
     else:
-        cascading_output(df)
+        cascading_output(df, corpus, award_workers, award_executor, time_windows, red_carpet_df)
+    # Each model should have been loaded exactly once for the whole run
+    print(f"Model loading:\n{format_load_stats()}")
+    if profile:
+        print(f"Profile:\n{format_profile_summary()}")
+        save_profile(profile)
+
+# Function to process several ceremonies in one process, e.g. to backfill past years
+# The models are loaded once and the award thread pool is shared by every year. Each year is preprocessed once for all modes.
+# The answers of each year are saved in output/{year}/, and the per-year throughput in output/batch_summary.json.
+def run_batch(years, modes=("hardcoded",), ner_processes=1, ner_batch_size=NER_BATCH_SIZE, stream=False, chunk_size=100000,
+              preprocess_workers=1, refresh_cache=False, award_workers=1, award_executor="thread", time_windows=False, dedup=False,
+              profile=None, gazetteer=False, entity_backend="lg", stage_cache=False, stage_cache_size=STAGE_CACHE_MAX_BYTES):
+    if profile:
+        enable_profiling()
+    set_entity_backend(entity_backend)
+    # Load the model before the first year, so its load time is not part of that year's throughput
+    get_nlp()
+    summary = []
+    pool = open_pool(award_workers, award_executor)
+    try:
+        for year in years:
+            print(f"Processing {year}")
+            start = time.perf_counter()
+            df, red_carpet_df, corpus = prepare_corpus(year, ner_processes, ner_batch_size, stream, chunk_size, preprocess_workers,
+                                                       refresh_cache=refresh_cache, dedup=dedup, gazetteer=gazetteer,
+                                                       entity_backend=entity_backend, stage_cache=stage_cache,
+                                                       stage_cache_size=stage_cache_size)
+            output_dir = os.path.join("output", str(year))
+            os.makedirs(output_dir, exist_ok=True)
+            for mode in modes:
+                if mode == "hardcoded":
+                    with open(f"data/gg{year}answers.json", 'r') as f:
+                        hardcoded_award_names = list(json.load(f)['award_data'].keys())
+                    hardcoded_output(df, hardcoded_award_names, corpus, award_workers, award_executor, time_windows, red_carpet_df,
+                                     output_dir, pool)
+                else:
+                    cascading_output(df, corpus, award_workers, award_executor, time_windows, red_carpet_df, output_dir, pool)
+            seconds = time.perf_counter() - start
+            summary.append({"Year": year, "Tweets": len(red_carpet_df), "Modes": list(modes), "Seconds": seconds,
+                            "Tweets/sec": len(red_carpet_df) / seconds})
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    print(f"{'Year':>6} {'Tweets':>9} {'Seconds':>9} {'Tweets/sec':>11}")
+    for result in summary:
+        print(f"{result['Year']:>6} {result['Tweets']:>9} {result['Seconds']:>9.2f} {result['Tweets/sec']:>11.1f}")
+    os.makedirs("output", exist_ok=True)
+    with open("output/batch_summary.json", 'w') as f:
+        json.dump({"Years": summary, "Model Loading": get_load_stats()}, f, indent=4)
+    print("Batch summary saved to output/batch_summary.json")
+    print(f"Model loading:\n{format_load_stats()}")
+    if profile:
+        print(f"Profile:\n{format_profile_summary()}")
+        save_profile(profile)
+    return summary
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Find the hosts, awards, presenters, nominees and winners of the Golden Globes from tweets.")
+    parser.add_argument("year", nargs="?", type=int, default=2013, help="year of the ceremony, reads data/gg{year}.json")
+    parser.add_argument("use_hardcoded", nargs="?", default="False", help="'True' to use the award names from data/gg{year}answers.json")
+    parser.add_argument("--ner-processes", type=int, default=1, help="number of processes used for NER (-1 uses every CPU)")
+    parser.add_argument("--ner-batch-size", type=int, default=NER_BATCH_SIZE, help="number of tweets per NER batch")
+    parser.add_argument("--preprocess-workers", type=int, default=1, help="number of processes used to preprocess the tweets")
+    parser.add_argument("--refresh-cache", action="store_true", help="preprocess the tweets again even if they are cached in cache/")
+    parser.add_argument("--award-workers", type=int, default=1, help="number of awards processed at once")
+    parser.add_argument("--award-executor", choices=list(EXECUTORS), default="thread", help="run the awards on threads or processes with --award-workers")
+    parser.add_argument("--time-windows", action="store_true", help="only search for each award in the burst of tweets around its announcement")
+    parser.add_argument("--dedup", action="store_true", help="process every distinct tweet text once, weighted by its number of copies")
+    parser.add_argument("--gazetteer", action="store_true", help="only nominate people and films of the year's movie dataset")
+    parser.add_argument("--entity-backend", choices=list(ENTITY_BACKENDS), default="lg",
+                        help="entity extractor: spacy en_core_web_lg, en_core_web_sm, or rules (capitalized words and the gazetteer)")
+    parser.add_argument("--stage-cache", action="store_true",
+                        help="cache the stage results in cache/stages/ and reuse them across modes and runs (--refresh-cache recomputes them)")
+    parser.add_argument("--stage-cache-size", type=int, default=STAGE_CACHE_MAX_BYTES >> 20, metavar="MB",
+                        help="evict the least recently used stage results once cache/stages/ grows above this many megabytes")
+    parser.add_argument("--profile", nargs="?", const="output/profile.json", default=None, metavar="FILE",
+                        help="time every stage, print a summary and write the trace to FILE (output/profile.json by default)")
+    parser.add_argument("--live", metavar="FILE", default=None, help="follow this line-delimited tweet file and keep output/live_* up to date")
+    parser.add_argument("--live-interval", type=float, default=60, help="seconds between updates of the answers with --live")
+    parser.add_argument("--live-idle-timeout", type=float, default=None, help="stop --live once no tweets arrived for this many seconds")
+    parser.add_argument("--years", type=int, nargs="+", default=None, help="process these years in one run, writing output/{year}/ for each")
+    parser.add_argument("--modes", nargs="+", choices=["hardcoded", "cascading"], default=None,
+                        help="modes to run for each year with --years (by default the one use_hardcoded picks)")
+    parser.add_argument("--stream", action="store_true", help="preprocess the tweets in chunks into data/gg{year}_store instead of parsing the whole file at once "
+                             "(the analysis columns are still loaded into memory afterwards)")
+    parser.add_argument("--chunk-size", type=int, default=100000, help="number of tweets per chunk with --stream")
+    args = parser.parse_args(argv)
+    if args.years and args.live:
+        parser.error("--live follows a single ceremony and can't be combined with --years")
+    return args
 
 if __name__ == "__main__":
-    # Set default values for year and use_hardcoded
-    year = 2013
-    use_hardcoded = False
-
-    # Update year and use_hardcoded based on command-line arguments
-    if len(sys.argv) > 1:
-        year = int(sys.argv[1])  # First argument is the year
-    if len(sys.argv) > 2:
-        use_hardcoded = sys.argv[2].lower() == 'true'  # Second argument is True/False for hardcoded
-
-    main(year, use_hardcoded=use_hardcoded)
\ No newline at end of file
+    args = parse_args()
+    if args.years:
+        modes = args.modes or (["hardcoded"] if args.use_hardcoded.lower() == 'true' else ["cascading"])
+        run_batch(args.years, modes, ner_processes=args.ner_processes, ner_batch_size=args.ner_batch_size,
+                  stream=args.stream, chunk_size=args.chunk_size, preprocess_workers=args.preprocess_workers,
+                  refresh_cache=args.refresh_cache, award_workers=args.award_workers, award_executor=args.award_executor,
+                  time_windows=args.time_windows, dedup=args.dedup, profile=args.profile, gazetteer=args.gazetteer,
+                  entity_backend=args.entity_backend, stage_cache=args.stage_cache, stage_cache_size=args.stage_cache_size << 20)
+    else:
+        main(args.year, use_hardcoded=args.use_hardcoded.lower() == 'true',
+             ner_processes=args.ner_processes, ner_batch_size=args.ner_batch_size,
+             stream=args.stream, chunk_size=args.chunk_size, preprocess_workers=args.preprocess_workers,
+             refresh_cache=args.refresh_cache, award_workers=args.award_workers, award_executor=args.award_executor,
+             live=args.live, live_interval=args.live_interval, live_idle_timeout=args.live_idle_timeout,
+             time_windows=args.time_windows, dedup=args.dedup,
+             profile=args.profile, gazetteer=args.gazetteer, entity_backend=args.entity_backend,
+             stage_cache=args.stage_cache, stage_cache_size=args.stage_cache_size << 20)
@@ -1,20 +1,21 @@
-import spacy
 import random
 import json
-import nltk
 import re
-from nltk.metrics.distance import edit_distance
-from util_functions.movie_data_utils import create_cast_crew_df
+from util_functions.movie_data_utils import create_cast_crew_df, MOVIE_STORE_DIR
+from util_functions.model_utils import get_nlp
+from util_functions.entity_utils import NER_BATCH_SIZE
+from util_functions.profile_utils import count
+from util_functions.fuzzy_utils import build_fuzzy_index, nearest_entities, entity_distance
 
 
 
-def define_entities(year):
+def define_entities(year, store_dir=MOVIE_STORE_DIR):
     '''
     Extract relevant PERSON & MOVIE entities from externally downloaded movies/credits data.
-    This function is no longer used as we removed cross-checking entities against this external data to speed up runtime.
+    Used by the gazetteer validation (see build_gazetteer). Compile the data once with compile_movie_store, so only the year's partition is loaded instead of parsing the csvs on every call.
     '''
 
-    crew_df, cast_df = create_cast_crew_df(year)
+    cast_df, crew_df = create_cast_crew_df(year, store_dir)
     
     # combine distinct names into list - one for movies, one for people
     titles = cast_df['title'].unique()
@@ -28,9 +29,11 @@ def define_entities(year):
     return movie_entities, people_entities
 
 
-def named_entity_recognition(input):
+def named_entity_recognition(input, n_process=1, batch_size=NER_BATCH_SIZE, counts=None):
     '''
-    Extracts entities from the input text using spacy.
+    Extracts entities from the input text using the active entity extractor (spacy by default, see set_entity_backend).
+    The texts are processed in batches, split across n_process worker processes.
+    If counts is given, the entities of each text count that many times (e.g. the 'tweet_count' of deduplicated tweets, see dedup_tweets).
 
     Example Input: 
     [
@@ -48,15 +51,18 @@ def named_entity_recognition(input):
         ...
     ]
     '''
-    spacy_model = spacy.load('en_core_web_lg')  # better entity recognition capability than en_core_web_sm
+    spacy_model = get_nlp()
 
     entity_frequency = {}
 
-    for text in input:
-        doc = spacy_model(text)
+    if counts is None:
+        counts = [1] * len(input)
+    count('NLP Calls', len(input))
+
+    for doc, weight in zip(spacy_model.pipe(input, batch_size=batch_size, n_process=n_process), counts):
         for entity in doc.ents:
             if entity.label_ == 'PERSON':
-                entity_frequency[entity.text] = entity_frequency.get(entity.text, 0) + 1
+                entity_frequency[entity.text] = entity_frequency.get(entity.text, 0) + weight
 
     entity_list = [
         {
@@ -72,13 +78,14 @@ def compute_edit_distance(string, entity_list):
     '''
     For a given string, compute edit distances against all entities in entity_list.
     Returns similarity scores against entities in sorted order, from most to least similar.
+    This scans every entity. To match many strings against the same entities, query a fuzzy index instead (see nearest_entities).
     '''
     entity_similarity_dict = {} # entity : similarity_score
 
     for entity in entity_list:
         # print(entity)
         try:
-            similarity = edit_distance(string.lower(), entity.lower(), transpositions=True)
+            similarity = entity_distance(string.lower(), entity.lower())
             # print(f"Entity: {entity} | Similarity: {similarity}")
             entity_similarity_dict[entity] = similarity
         except:
@@ -126,13 +133,16 @@ def token_overlap(query_string, classes):
     return best_classes
 
 
-def aggregate_candidates(potential_winners, entity_list, top_n=5):
+def aggregate_candidates(potential_winners, entity_list, top_n=5, entity_index=None):
     '''
     Given potential winners for an award, extract the top N candidates and winner by majority vote (number of tweets).
     If multiple names in "potential_winners" refer to the same entity, this function attempts to map them to the 'correct' entity via Levenshtein distance,
     where the 'correct' entity is an entity in the entity_list, and then combine their popularity count towards that entity. 
-    This function is no longer used as we removed cross-checking entities against external data to speed up runtime.
+    The entities are matched through a fuzzy index (see build_fuzzy_index), which is built here unless entity_index is given.
+    Pass the same entity_index for every award, so it is only built once.
     '''
+    if entity_index is None:
+        entity_index = build_fuzzy_index(entity_list)
     
     # data structure -> entity : count
     entity_count = {} 
@@ -147,7 +157,7 @@ def aggregate_candidates(potential_winners, entity_list, top_n=5):
         winner_count = winner_info["Number of Tweets"]
         
         # identify entities "closest" to winner_name - quantified via similarity metric
-        best_matches = compute_edit_distance(winner_name, entity_list=entity_list)[:top_n]
+        best_matches = nearest_entities(entity_index, winner_name, top_n)
         best_match = best_matches[0][1] # [0] for top match, [1] for name
         
         # map name to entity, update entity count
@@ -213,11 +223,12 @@ def is_person_name(text):
     if 'RT @' in text:
         return False
     
-    # Load the English language model
-    nlp = spacy.load("en_core_web_lg")
+    # Get the shared English language model
+    nlp = get_nlp()
 
     # Use spaCy for named entity recognition
     doc = nlp(text)
+    count('NLP Calls')
         
     # Check if any entity is labeled as a person
     if any(ent.label_ == "PERSON" for ent in doc.ents):
@@ -0,0 +1,90 @@
+import numpy as np
+from collections import deque
+from util_functions.predictions_utils import remove_punctuation
+from util_functions.profile_utils import count
+
+
+def normalize_award_text(text):
+    # Same normalization the per-award filters use: no punctuation, lower case
+    return remove_punctuation(text).lower()
+
+
+def build_award_automaton(award_names):
+    '''
+    Builds an Aho-Corasick automaton over the normalized award names, so that every award mentioned in a tweet
+    can be found in a single pass over the tweet instead of one substring search per award.
+
+    Returns (goto, fail, output):
+    - goto[state] maps a character to the next state
+    - fail[state] is the state to fall back to when no transition exists
+    - output[state] lists the indices (into award_names) of the awards that end at this state
+    '''
+    goto, fail, output = [{}], [0], [[]]
+
+    # Build the trie of award names
+    for award_index, award in enumerate(award_names):
+        state = 0
+        for char in normalize_award_text(award):
+            next_state = goto[state].get(char)
+            if next_state is None:
+                next_state = len(goto)
+                goto[state][char] = next_state
+                goto.append({})
+                fail.append(0)
+                output.append([])
+            state = next_state
+        output[state].append(award_index)
+
+    # Add failure links breadth first, so the failure state of a node is always computed before its children
+    queue = deque(goto[0].values())
+    while queue:
+        state = queue.popleft()
+        for char, next_state in goto[state].items():
+            queue.append(next_state)
+            fallback = fail[state]
+            while fallback and char not in goto[fallback]:
+                fallback = fail[fallback]
+            fail[next_state] = goto[fallback].get(char, 0)
+            output[next_state] = output[next_state] + output[fail[next_state]]
+
+    return goto, fail, output
+
+
+def match_awards(automaton, text):
+    '''
+    Returns the set of award indices whose normalized name appears in the (already normalized) text.
+    '''
+    goto, fail, output = automaton
+    matches = set(output[0])  # awards with an empty normalized name match every tweet
+    state = 0
+    for char in text:
+        while state and char not in goto[state]:
+            state = fail[state]
+        state = goto[state].get(char, 0)
+        if output[state]:
+            matches.update(output[state])
+    return matches
+
+
+def build_award_postings(tweet_ids, normalized_texts, award_names):
+    '''
+    Finds which tweets mention each award in one pass over the tweets.
+    A tweet mentions an award if the award name without punctuation is a substring of the tweet without punctuation (case-insensitive),
+    the same test the per-award filters used to run for every award.
+    normalized_texts must already be normalized (see normalize_text), e.g. the 'normalized_text' column from preprocess_tweets.
+
+    Example output:
+    {
+        "best motion picture - drama": array([290000000000000012, 290000000000000345, ...]),
+        ...
+    }
+    '''
+    automaton = build_award_automaton(award_names)
+
+    postings = [[] for _ in award_names]
+    count('Tweets', len(tweet_ids))
+    for tweet_id, text in zip(tweet_ids, normalized_texts):
+        for award_index in match_awards(automaton, text):
+            postings[award_index].append(tweet_id)
+
+    return {award: np.unique(np.array(tweet_ids, dtype=np.int64)) for award, tweet_ids in zip(award_names, postings)}
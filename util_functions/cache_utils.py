@@ -0,0 +1,213 @@
+import os
+import glob
+import json
+import pickle
+import hashlib
+import threading
+import pyarrow as pa
+import pyarrow.ipc as ipc
+from util_functions import preprocessing_utils
+from util_functions.preprocessing_utils import preprocess_tweets
+from util_functions.profile_utils import count
+
+# Directory the preprocessed tweets are cached in
+CACHE_DIR = "cache"
+
+# Directory the stage results are cached in (see cached_stage), and how large it may grow before the oldest results are evicted
+STAGE_CACHE_DIR = os.path.join(CACHE_DIR, "stages")
+STAGE_CACHE_MAX_BYTES = 256 << 20
+
+# Code the stage results depend on, any edit to it invalidates the cached results
+PIPELINE_SOURCES = ["main.py", os.path.join("util_functions", "*.py")]
+
+# Columns of the preprocessed frame that hold lists (Arrow hands them back as arrays)
+LIST_COLUMNS = ['hashtags', 'links']
+
+
+def file_digest(filename, block_size=1 << 20):
+    '''
+    Returns the sha256 hex digest of the contents of filename, read in blocks so large files are not loaded at once.
+    '''
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def preprocessing_fingerprint(filename):
+    '''
+    Fingerprint of the preprocessed frame for filename: a hash of the contents of the file and of the preprocessing code.
+    Editing either the tweets or preprocessing_utils.py gives a new fingerprint, so a stale cache is never loaded.
+    '''
+    digest = hashlib.sha256()
+    digest.update(file_digest(filename).encode())
+    digest.update(file_digest(preprocessing_utils.__file__).encode())
+    return digest.hexdigest()[:16]
+
+
+def cached_preprocess_tweets(filename, cache_dir=CACHE_DIR, workers=1, refresh=False, columns=None):
+    '''
+    Same as preprocess_tweets, but the preprocessed frame is cached in cache_dir as an Arrow IPC file.
+    The cache is keyed by preprocessing_fingerprint, and later runs memory map it instead of preprocessing the tweets again.
+    Pass refresh=True to ignore the cache and preprocess the tweets again, and columns to only load the columns that are needed.
+    '''
+    name = os.path.splitext(os.path.basename(filename))[0]
+    path = os.path.join(cache_dir, f"{name}-{preprocessing_fingerprint(filename)}.arrow")
+
+    if os.path.exists(path) and not refresh:
+        print(f"Cache hit: loading preprocessed tweets from {path}")
+        count('Cache Hits')
+        return load_cached_frame(path, columns)
+
+    df = preprocess_tweets(filename, workers=workers)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    # Remove caches of older versions of the same file
+    for stale in glob.glob(os.path.join(cache_dir, f"{name}-*.arrow")):
+        os.remove(stale)
+    # Write to a temporary file first, so an interrupted run never leaves a truncated cache behind
+    table = pa.Table.from_pandas(df, preserve_index=True)
+    with ipc.new_file(path + ".tmp", table.schema) as writer:
+        writer.write_table(table)
+    os.replace(path + ".tmp", path)
+    print(f"Cached preprocessed tweets in {path}")
+
+    if columns is not None:
+        df = df[columns]
+    return df
+
+
+def load_cached_frame(path, columns=None):
+    '''
+    Loads a frame written by cached_preprocess_tweets. The file is memory mapped, so only the requested columns are read.
+    '''
+    table = ipc.open_file(pa.memory_map(path)).read_all()
+    if columns is not None:
+        index_columns = [column for column in table.column_names if column.startswith('__index_level_')]
+        table = table.select(columns + index_columns)
+    df = table.to_pandas()
+
+    for column in LIST_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].map(list)
+
+    return df
+
+
+def code_fingerprint(root=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))):
+    '''
+    Hash of the pipeline code (see PIPELINE_SOURCES), so stage results cached by an older version of the code are never loaded.
+    '''
+    digest = hashlib.sha256()
+    for pattern in PIPELINE_SOURCES:
+        for filename in sorted(glob.glob(os.path.join(root, pattern))):
+            digest.update(os.path.relpath(filename, root).encode())
+            digest.update(file_digest(filename).encode())
+    return digest.hexdigest()
+
+
+def corpus_fingerprint(filename, **options):
+    '''
+    Fingerprint of a corpus: a hash of the tweets file, of the pipeline code and of the options the corpus was built with
+    (e.g. dedup or the entity backend). Two runs with the same fingerprint compute the same stage results.
+    '''
+    digest = hashlib.sha256()
+    digest.update(file_digest(filename).encode())
+    digest.update(code_fingerprint().encode())
+    digest.update(json.dumps(options, sort_keys=True, default=str).encode())
+    return digest.hexdigest()[:16]
+
+
+def open_stage_cache(fingerprint, cache_dir=STAGE_CACHE_DIR, max_bytes=STAGE_CACHE_MAX_BYTES, refresh=False):
+    '''
+    Returns the stage cache of a corpus, for cached_stage. Open it once per corpus and share it between the modes.
+    Pass refresh=True to drop the results cached for this fingerprint, so every stage is computed again once,
+    and then reused by the other modes that share the stage cache.
+
+    Example output:
+    {"fingerprint": "3f9a0c1d2b4e5f67", "dir": "cache/stages", "max_bytes": 268435456}
+    '''
+    os.makedirs(cache_dir, exist_ok=True)
+    if refresh:
+        for path in glob.glob(os.path.join(cache_dir, f"{fingerprint}-*.pkl")):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+    return {"fingerprint": fingerprint, "dir": cache_dir, "max_bytes": max_bytes}
+
+
+def stage_cache_path(stage_cache, stage_name, params):
+    # One file per (corpus fingerprint, stage, parameters), the award name is one of the parameters of the per-award stages.
+    # The name starts with the fingerprint, so the results of a corpus can be found (see open_stage_cache).
+    key = json.dumps([stage_cache["fingerprint"], stage_name, params], sort_keys=True, default=str)
+    digest = hashlib.sha256(key.encode()).hexdigest()[:24]
+    return os.path.join(stage_cache["dir"], f"{stage_cache['fingerprint']}-{stage_name}-{digest}.pkl")
+
+
+def cached_stage(stage_cache, stage_name, params, func, *args):
+    '''
+    Returns func(*args), the result of stage_name for params (a dict of whatever else the result depends on, e.g. the award name),
+    from the stage cache if an earlier run or mode already computed it. Otherwise it is computed and cached.
+    With stage_cache None, func is simply called.
+    Results are pickled in the cache directory, and the least recently used ones are evicted once it grows above its max_bytes.
+    '''
+    if stage_cache is None:
+        return func(*args)
+
+    path = stage_cache_path(stage_cache, stage_name, params)
+    try:
+        with open(path, 'rb') as f:
+            result = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        pass
+    else:
+        # Mark the result as recently used, eviction removes the oldest ones first
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            # Evicted by another award since it was loaded, the result is still good
+            pass
+        print(f"Cache hit: loading {stage_name} from {path}")
+        count('Stage Cache Hits')
+        return result
+
+    result = func(*args)
+
+    # Write to a temporary file first, so an interrupted run or a concurrent award never leaves a truncated result behind
+    tmp_path = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+    evict_stage_cache(stage_cache["dir"], stage_cache["max_bytes"])
+    return result
+
+
+def evict_stage_cache(cache_dir=STAGE_CACHE_DIR, max_bytes=STAGE_CACHE_MAX_BYTES):
+    '''
+    Removes the least recently used stage results until the results in cache_dir take at most max_bytes.
+    Returns the number of results removed.
+    '''
+    entries = []
+    for entry in os.scandir(cache_dir):
+        if entry.name.endswith(".pkl"):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                # Evicted by another worker in the meantime
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            removed += 1
+        except FileNotFoundError:
+            pass
+        total -= size
+    return removed
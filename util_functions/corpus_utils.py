@@ -0,0 +1,51 @@
+from util_functions.entity_utils import build_entity_table, NER_BATCH_SIZE
+from util_functions.award_index_utils import build_award_postings
+from util_functions.predictions_utils import filter_present_tweets
+from util_functions.preprocessing_utils import build_token_index, normalize_text
+from util_functions.time_utils import build_time_index, find_burst_window, tweets_in_window
+
+
+def build_corpus(df, ner_processes=1, ner_batch_size=NER_BATCH_SIZE):
+    '''
+    Builds the corpus-level lookup structures that are shared by every stage (hosts, awards, red carpet).
+    These are computed once per run from the preprocessed frame returned by preprocess_tweets.
+    ner_processes and ner_batch_size control how the NER pass is spread across CPU cores (see build_entity_table).
+
+    Example output:
+    {
+        "entities": <entity table, see build_entity_table>,
+        "tokens": <inverted token index, see build_token_index>
+    }
+    '''
+    print(f"Running NER over {len(df)} tweets with {ner_processes} process(es)")
+    entities = build_entity_table(df, batch_size=ner_batch_size, n_process=ner_processes)
+
+    print("Building token index")
+    tokens = build_token_index(df)
+
+    return {
+        "entities": entities,
+        "tokens": tokens
+    }
+
+
+def index_awards(corpus, df, award_names, time_windows=False):
+    '''
+    Adds the award postings to the corpus: which tweets mention each award, found in a single pass over the tweets.
+    "award_postings" covers every tweet (used for nominees), "presenter_postings" covers the tweets about presenting (used for presenters).
+    With time_windows, also adds "award_windows": the window of time around the burst of tweets mentioning each award
+    (see find_burst_window), so the per-award stages only need to scan the tweets inside it.
+    '''
+    print(f"Indexing {len(award_names)} awards")
+    corpus["award_postings"] = build_award_postings(df['id'], df['normalized_text'], award_names)
+    present_df = filter_present_tweets(df, corpus["tokens"])
+    corpus["presenter_postings"] = build_award_postings(present_df['id'], normalize_text(present_df['cleaned_text']), award_names)
+
+    if time_windows:
+        time_index = build_time_index(df)
+        corpus["award_windows"] = {award: find_burst_window(time_index, corpus["award_postings"][award]) for award in award_names}
+        window_sizes = [len(tweets_in_window(df, window)) for window in corpus["award_windows"].values()]
+        if window_sizes:
+            print(f"Award windows hold {sum(window_sizes) / len(window_sizes):.0f} of {len(df)} tweets on average")
+
+    return corpus
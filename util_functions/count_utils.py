@@ -0,0 +1,61 @@
+import numpy as np
+
+
+def count_ids(ids, weights=None):
+    '''
+    Counts the occurrences of each integer id (e.g. the interned entity ids, see build_entity_table) as a NumPy count vector.
+    With weights, each occurrence counts as its weight (e.g. the 'tweet_count' of deduplicated tweets).
+    Returns the distinct ids, their counts and the position of their first occurrence.
+
+    Example output:
+    (array([0, 3, 7]), array([12, 2, 5]), array([0, 4, 1]))
+    '''
+    ids = np.asarray(ids, dtype=np.int64)
+    unique_ids, first, inverse = np.unique(ids, return_index=True, return_inverse=True)
+    if weights is None:
+        counts = np.bincount(inverse.ravel(), minlength=len(unique_ids))
+    else:
+        # bincount adds weights up as floats, which is exact for any realistic number of tweets
+        counts = np.bincount(inverse.ravel(), weights=np.asarray(weights, dtype=np.float64), minlength=len(unique_ids))
+        counts = counts.astype(np.int64)
+    return unique_ids, counts, first
+
+
+def rank_counts(counts, first, top_n=None):
+    '''
+    Returns the positions of counts sorted by count in descending order, ties in order of first occurrence,
+    which is the order sorting a {name: count} dict by count gives.
+    With top_n, only the top_n positions are returned, and only the candidates for them are sorted (found with argpartition).
+    '''
+    candidates = np.arange(len(counts))
+    if top_n is not None and top_n < len(counts):
+        # Every count tied with the top_n-th largest count is kept, so ties at the cut are still broken by first occurrence
+        threshold = counts[np.argpartition(counts, len(counts) - top_n)[len(counts) - top_n]]
+        candidates = np.flatnonzero(counts >= threshold)
+    order = candidates[np.lexsort((first[candidates], -counts[candidates]))]
+    return order[:top_n]
+
+
+def count_list(names, counts, order):
+    # The {"Name", "Number of Tweets"} list every stage returns, with plain ints so it can be written as JSON
+    return [{'Name': names[i], 'Number of Tweets': count} for i, count in zip(order.tolist(), counts[order].tolist())]
+
+
+def rank_name_counts(name_counts, keep=None, top_n=None):
+    '''
+    Ranks a {name: count} dict (e.g. the potential winners, see count_potential_winners) like rank_counts,
+    keeping only the names in keep if it is given (e.g. the nominees).
+
+    Example output:
+    [
+        {'Name': 'Argo', 'Number of Tweets': 12},
+        ...
+    ]
+    '''
+    names = np.array(list(name_counts), dtype=object)
+    counts = np.fromiter(name_counts.values(), dtype=np.int64, count=len(name_counts))
+    first = np.arange(len(names))
+    if keep is not None:
+        kept = np.isin(names, np.array(list(keep), dtype=object))
+        names, counts, first = names[kept], counts[kept], first[kept]
+    return count_list(names, counts, rank_counts(counts, first, top_n))
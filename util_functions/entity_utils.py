@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+from util_functions.model_utils import get_nlp
+from util_functions.profile_utils import count
+from util_functions.count_utils import count_ids, rank_counts, count_list
+
+# Columns of the per-tweet entity table
+# context_start/context_end are the character offsets of the window of CONTEXT_WINDOW tokens around the entity
+ENTITY_COLUMNS = ['tweet_id', 'start', 'end', 'label', 'text', 'context_start', 'context_end']
+
+# Number of tokens before/after an entity kept as its context window (used by the red carpet analysis)
+CONTEXT_WINDOW = 10
+
+# Default number of tweets spacy processes per batch
+NER_BATCH_SIZE = 1000
+
+
+def build_entity_table(df, text_column='clean_text', batch_size=NER_BATCH_SIZE, n_process=1):
+    '''
+    Runs NER once over the whole corpus and returns a compact entity table that every stage can query,
+    instead of each stage running spacy over its own slice of the tweets.
+    With n_process > 1 the tweets are split across that many worker processes (-1 uses every CPU).
+    The table is identical to the one built by a single process.
+    If the frame was deduplicated (see dedup_tweets), every entity also gets the 'tweet_count' of its tweet.
+    The 'text' column is interned: it is categorical, with one category per distinct name in order of first mention,
+    so its codes are the entity ids (see entity_ids) and names are compared and counted as integers.
+
+    Example output:
+        tweet_id            start  end  label   text           context_start  context_end  is_person
+        290000000000000000  0      13   PERSON  Anne Hathaway  0              45           True
+        ...
+    '''
+    nlp = get_nlp()
+
+    rows = {column: [] for column in ENTITY_COLUMNS}
+    count('Tweets', len(df))
+    count('NLP Calls', len(df))
+    docs = nlp.pipe(df[text_column].tolist(), batch_size=batch_size, n_process=n_process)
+    for tweet_id, doc in zip(df['id'].tolist(), docs):
+        for ent in doc.ents:
+            context = doc[max(0, ent.start - CONTEXT_WINDOW):min(len(doc), ent.end + CONTEXT_WINDOW)]
+            rows['tweet_id'].append(tweet_id)
+            rows['start'].append(ent.start_char)
+            rows['end'].append(ent.end_char)
+            rows['label'].append(ent.label_)
+            rows['text'].append(ent.text)
+            rows['context_start'].append(context.start_char)
+            rows['context_end'].append(context.end_char)
+
+    entities = pd.DataFrame(rows)
+    entities['label'] = entities['label'].astype('category')
+    entities['text'] = pd.Categorical(entities['text'], categories=pd.unique(entities['text']))
+
+    # Check once per distinct PERSON string whether it is a person name on its own (see is_person_name),
+    # so later stages don't need to run spacy on candidate names again
+    person_texts = entities.loc[entities['label'] == 'PERSON', 'text'].unique().tolist()
+    count('NLP Calls', len(person_texts))
+    person_names = {
+        text for text, doc in zip(person_texts, nlp.pipe(person_texts, batch_size=batch_size, n_process=n_process))
+        if 'RT @' not in text and any(ent.label_ == 'PERSON' for ent in doc.ents)
+    }
+    entities['is_person'] = (entities['label'] == 'PERSON') & entities['text'].isin(person_names)
+
+    if 'tweet_count' in df.columns:
+        entities['tweet_count'] = entities['tweet_id'].map(dict(zip(df['id'], df['tweet_count'])))
+
+    return entities
+
+
+def tweet_entities(entities, tweet_ids, label=None):
+    '''
+    Returns the rows of the entity table that belong to the given tweets, optionally only those with the given label.
+    Rows keep the order of the table, which is the order of the tweets in the frame the table was built from.
+    '''
+    mask = entities['tweet_id'].isin(tweet_ids)
+    if label is not None:
+        mask &= entities['label'] == label
+    return entities[mask]
+
+
+def entity_ids(entities):
+    # Interned ids of the entities of (a slice of) the entity table, see build_entity_table
+    return entities['text'].cat.codes.to_numpy()
+
+
+def intern_names(entities, names):
+    # Ids of the given names in the entity table, -1 for names that are not in it
+    return entities['text'].cat.categories.get_indexer(list(names))
+
+
+def count_entities(entities, top_n=None, exclude=None):
+    '''
+    Counts entity mentions in (a slice of) the entity table.
+    Returns the same structure as named_entity_recognition: entities sorted by number of mentions, ties in order of first mention.
+    Entities of deduplicated tweets count as many times as the tweet was tweeted (see dedup_tweets).
+    Mentions are counted as a vector over the interned ids, so with top_n only the top_n entities are sorted and returned.
+    Names in exclude (e.g. the hosts) are left out.
+
+    Example Output:
+    [
+        {
+            'Name': 'Anne Hathaway',
+            'Number of Tweets': 2
+        },
+        ...
+    ]
+    '''
+    weights = entities['tweet_count'] if 'tweet_count' in entities.columns else None
+    ids, counts, first = count_ids(entity_ids(entities), weights)
+
+    if exclude is not None:
+        kept = ~np.isin(ids, intern_names(entities, exclude))
+        ids, counts, first = ids[kept], counts[kept], first[kept]
+
+    return count_list(entities['text'].cat.categories[ids], counts, rank_counts(counts, first, top_n))
@@ -0,0 +1,110 @@
+def entity_distance(a, b):
+    # nltk edit distance with transpositions, the (unrestricted) Damerau-Levenshtein distance, which is a metric.
+    # nltk is imported on first use (after that the import is a dictionary lookup), so importing this module stays cheap.
+    from nltk.metrics.distance import edit_distance
+    return edit_distance(a, b, transpositions=True)
+
+
+def build_fuzzy_index(entity_list):
+    '''
+    Builds a BK-tree over the entities (compared in lower case), so the entities closest to a string can be found
+    without computing the distance to every entity (see nearest_entities). Build it once and query it for every candidate.
+    Entities that are not strings are skipped, like compute_edit_distance does.
+
+    Example output:
+    {
+        "root": {"key": "anne hathaway", "entities": ["Anne Hathaway"], "children": {3: {...}, 7: {...}}},
+        "size": 5210
+    }
+    '''
+    index = {"root": None, "size": 0}
+    for entity in entity_list:
+        if not isinstance(entity, str):
+            continue
+        key = entity.lower()
+        index["size"] += 1
+        if index["root"] is None:
+            index["root"] = {"key": key, "entities": [entity], "children": {}}
+            continue
+
+        node = index["root"]
+        while True:
+            distance = entity_distance(key, node["key"])
+            if distance == 0:
+                if entity not in node["entities"]:
+                    node["entities"].append(entity)
+                break
+            if distance not in node["children"]:
+                node["children"][distance] = {"key": key, "entities": [entity], "children": {}}
+                break
+            node = node["children"][distance]
+
+    return index
+
+
+def nearest_entities(index, string, top_n=5):
+    '''
+    Returns the top_n entities of the index closest to string, as (distance, entity) tuples sorted like compute_edit_distance sorts them.
+    The search keeps the distance of the top_n-th closest entity found so far and skips every subtree that cannot hold a closer one
+    (by the triangle inequality), so only a fraction of the entities are compared.
+
+    Example output:
+    [(0, 'Anne Hathaway'), (4, 'Anne Heche'), ...]
+    '''
+    if index["root"] is None:
+        return []
+
+    string = string.lower()
+    matches = []
+    radius = float('inf')
+    stack = [index["root"]]
+    while stack:
+        node = stack.pop()
+        distance = entity_distance(string, node["key"])
+        if distance <= radius:
+            matches.extend((distance, entity) for entity in node["entities"])
+            if len(matches) >= top_n:
+                radius = sorted(match[0] for match in matches)[top_n - 1]
+        # Ties with the top_n-th distance are kept, they are broken by name below
+        children = [(key, child) for key, child in node["children"].items() if distance - radius <= key <= distance + radius]
+        # Visit the child closest to the string's distance first (it is popped last pushed), so the radius shrinks early
+        children.sort(key=lambda item: -abs(item[0] - distance))
+        stack.extend(child for _, child in children)
+
+    return sorted(match for match in matches if match[0] <= radius)[:top_n]
+
+
+def merge_contained_names(name_counts):
+    '''
+    Merges partial names into the names containing them (or contained in them), e.g. "Amy" into "Amy Poehler".
+    name_counts is a list of (name, count) tuples. Each name is merged into the first name kept so far that contains it or
+    that it contains, otherwise it is kept. Kept names are indexed by their substrings, so a name is matched by looking
+    up its own substrings instead of comparing it to every kept name.
+
+    Example output:
+    {
+        "Amy Poehler": 812,
+        "Tina Fey": 790
+    }
+    '''
+    merged = {}
+    # Kept names in order, the position of each, and the first kept name containing each substring
+    kept = []
+    positions = {}
+    containing = {}
+    for name, count in name_counts:
+        substrings = {name[start:end] for start in range(len(name) + 1) for end in range(start, len(name) + 1)}
+        matches = [positions[substring] for substring in substrings if substring in positions]
+        if name in containing:
+            matches.append(positions[containing[name]])
+
+        if matches:
+            merged[kept[min(matches)]] += count
+        else:
+            positions[name] = len(kept)
+            kept.append(name)
+            merged[name] = count
+            for substring in substrings:
+                containing.setdefault(substring, name)
+
+    return merged
@@ -0,0 +1,94 @@
+import pandas as pd
+from util_functions.model_utils import get_nlp
+from util_functions.aggregation_utils import define_entities
+from util_functions.movie_data_utils import MOVIE_STORE_DIR
+from util_functions.entity_utils import NER_BATCH_SIZE
+from util_functions.profile_utils import count
+
+# Columns of the gazetteer mention table
+MENTION_COLUMNS = ['tweet_id', 'start', 'end', 'label', 'text']
+
+
+def build_gazetteer(year, store_dir=MOVIE_STORE_DIR):
+    '''
+    Compiles the people and films of the year (see define_entities) into a case-insensitive PhraseMatcher, once per year.
+    People are matched as PERSON and films as WORK_OF_ART, the labels the nominee search uses.
+    Only the tokenizer is run over the names, so building it does not run NER.
+
+    Example output:
+    {
+        "year": 2013,
+        "matcher": <PhraseMatcher>,
+        "names": {"PERSON": {"anne hathaway", ...}, "WORK_OF_ART": {"argo", ...}}
+    }
+    '''
+    from spacy.matcher import PhraseMatcher
+
+    movie_entities, people_entities = define_entities(year, store_dir)
+    names = {
+        "PERSON": {name.lower() for name in people_entities if isinstance(name, str)},
+        "WORK_OF_ART": {title.lower() for title in movie_entities if isinstance(title, str)}
+    }
+
+    nlp = get_nlp()
+    matcher = PhraseMatcher(nlp.vocab, attr="LOWER")
+    for label, label_names in names.items():
+        matcher.add(label, list(nlp.tokenizer.pipe(sorted(label_names), batch_size=NER_BATCH_SIZE)))
+    print(f"Gazetteer for {year}: {len(names['PERSON'])} people, {len(names['WORK_OF_ART'])} films")
+
+    return {"year": year, "matcher": matcher, "names": names}
+
+
+def mark_gazetteer_mentions(gazetteer, df, text_column='clean_text', batch_size=NER_BATCH_SIZE):
+    '''
+    Finds every mention of a known person or film in the tweets in a single tokenizer pass.
+    Overlapping matches keep the longest one, e.g. "Life of Pi" rather than "Pi".
+
+    Example output:
+        tweet_id            start  end  label        text
+        290000000000000000  0      4    WORK_OF_ART  Argo
+        ...
+    '''
+    from spacy.util import filter_spans
+
+    nlp = get_nlp()
+    matcher = gazetteer["matcher"]
+
+    rows = {column: [] for column in MENTION_COLUMNS}
+    count('Tweets', len(df))
+    for tweet_id, doc in zip(df['id'].tolist(), nlp.tokenizer.pipe(df[text_column].tolist(), batch_size=batch_size)):
+        spans = filter_spans(matcher(doc, as_spans=True))
+        for span in spans:
+            rows['tweet_id'].append(tweet_id)
+            rows['start'].append(span.start_char)
+            rows['end'].append(span.end_char)
+            rows['label'].append(span.label_)
+            rows['text'].append(span.text)
+
+    mentions = pd.DataFrame(rows)
+    mentions['label'] = mentions['label'].astype('category')
+    return mentions
+
+
+def index_gazetteer(corpus, df, gazetteer):
+    '''
+    Adds the gazetteer mentions of the tweets (see mark_gazetteer_mentions) to the corpus, and "known_names":
+    the lower case names of the known people and films mentioned at least once, by label, which candidates are validated against.
+    '''
+    mentions = mark_gazetteer_mentions(gazetteer, df)
+    corpus["gazetteer_mentions"] = mentions
+    corpus["known_names"] = {
+        label: set(mentions.loc[mentions['label'] == label, 'text'].str.lower())
+        for label in gazetteer["names"]
+    }
+    print(f"Found {len(mentions)} mentions of known people and films")
+    return corpus
+
+
+def validate_candidates(candidates, known_names):
+    '''
+    Keeps the candidates (a list of {"Name", "Number of Tweets"}) that are known names, a set lookup per candidate.
+    If none of them is known (e.g. the dataset is missing a film), the candidates are returned unchanged.
+    '''
+    validated = [candidate for candidate in candidates if candidate['Name'].lower() in known_names]
+    return validated if validated else candidates
@@ -0,0 +1,129 @@
+import os
+import json
+import time
+import numpy as np
+import pandas as pd
+from util_functions.preprocessing_utils import preprocess_frame
+from util_functions.corpus_utils import build_corpus, index_awards
+from util_functions.entity_utils import tweet_entities, entity_ids, NER_BATCH_SIZE
+from util_functions.predictions_utils import count_nominees, count_potential_winners, filter_host_tweets, filter_presenter_tweets
+from util_functions.count_utils import count_ids, rank_name_counts
+
+
+def tail_tweets(filename, poll_interval=1.0, max_idle=None):
+    '''
+    Follows a line-delimited JSON file of tweets as it grows, like 'tail -f'.
+    Yields the list of tweets appended since the previous poll (an empty list if there are none), polling every poll_interval seconds.
+    A line is only read once it is complete, so a tweet that is still being written is picked up by the next poll.
+    Lines that aren't valid JSON (e.g. cut off by a writer that crashed) are skipped, see decode_tweet_lines.
+    Stops once no new tweets arrived for max_idle seconds, or never if max_idle is None.
+    '''
+    offset = 0
+    last_tweet_time = time.monotonic()
+    while True:
+        tweets = []
+        if os.path.exists(filename):
+            # Start over if the file was truncated or replaced by a shorter one
+            if os.path.getsize(filename) < offset:
+                offset = 0
+            with open(filename, 'rb') as f:
+                f.seek(offset)
+                data = f.read()
+            # Only read up to the end of the last complete line
+            end = data.rfind(b'\n') + 1
+            tweets = decode_tweet_lines(data[:end].splitlines())
+            offset += end
+
+        if tweets:
+            last_tweet_time = time.monotonic()
+        elif max_idle is not None and time.monotonic() - last_tweet_time >= max_idle:
+            return
+
+        yield tweets
+
+        if not tweets:
+            time.sleep(poll_interval)
+
+
+def decode_tweet_lines(lines):
+    '''
+    Decodes the tweets of complete lines of a line-delimited JSON file, skipping blank lines.
+    A line that isn't valid JSON is logged and skipped, so one bad line doesn't stop live mode.
+    '''
+    tweets = []
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            tweets.append(json.loads(line))
+        except json.JSONDecodeError as error:
+            print(f"Skipping malformed tweet line ({error}): {line[:80]!r}")
+    return tweets
+
+
+def new_live_counts(award_names):
+    '''
+    Returns empty running counts for live mode, see update_live_counts.
+
+    Example output (once tweets were added):
+    {
+        "Tweets": 1200,
+        "Hosts": {"Tina Fey": 40, ...},
+        "Nominees": {"best director - motion picture": {"Ben Affleck": 7, ...}, ...},
+        "Winners": {"best director - motion picture": {"Ben Affleck": 3, ...}, ...},
+        "Presenters": {"best director - motion picture": {"Halle Berry": 2, ...}, ...}
+    }
+    '''
+    return {
+        "Tweets": 0,
+        "Hosts": {},
+        "Nominees": {award: {} for award in award_names},
+        "Winners": {award: {} for award in award_names},
+        "Presenters": {award: {} for award in award_names}
+    }
+
+
+def add_counts(counts, new_counts):
+    for name, count in new_counts.items():
+        counts[name] = counts.get(name, 0) + count
+
+
+def entity_counts(entities):
+    # The mention counts of the entities as a {name: count} dict in order of first mention, like count_entities counts them.
+    # Added batch after batch, the running counts stay in order of first mention, so ranked_entities breaks ties
+    # the way the batch stages do wherever the batches are split.
+    weights = entities['tweet_count'] if 'tweet_count' in entities.columns else None
+    ids, counts, first = count_ids(entity_ids(entities), weights)
+    order = np.argsort(first)
+    return dict(zip(entities['text'].cat.categories[ids[order]].tolist(), counts[order].tolist()))
+
+
+def update_live_counts(counts, tweets, award_names, ner_batch_size=NER_BATCH_SIZE):
+    '''
+    Adds a batch of new raw tweets (as found in gg{year}.json) to the running counts.
+    Only the new tweets are preprocessed, run through NER and matched against the awards,
+    so the cost of an update depends on the number of new tweets and not on the number of tweets seen so far.
+    '''
+    if not tweets:
+        return counts
+
+    df = preprocess_frame(pd.DataFrame(tweets))
+    corpus = index_awards(build_corpus(df, ner_batch_size=ner_batch_size), df, award_names)
+    entities = corpus["entities"]
+
+    counts["Tweets"] += len(df)
+    add_counts(counts["Hosts"], entity_counts(tweet_entities(entities, filter_host_tweets(df, corpus["tokens"])['id'], 'PERSON')))
+    for award in award_names:
+        add_counts(counts["Nominees"][award], count_nominees(df, award, entities, corpus["award_postings"]))
+        add_counts(counts["Winners"][award], count_potential_winners(df, award))
+        presenters = tweet_entities(entities, filter_presenter_tweets(df, award, corpus["presenter_postings"])['id'], 'PERSON')
+        add_counts(counts["Presenters"][award], entity_counts(presenters[presenters['is_person']]))
+
+    return counts
+
+
+def ranked_entities(counts):
+    '''
+    Converts running counts to the list of {"Name", "Number of Tweets"} the batch stages return, sorted by number of tweets.
+    '''
+    return rank_name_counts(counts)
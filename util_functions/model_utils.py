@@ -0,0 +1,161 @@
+import time
+import threading
+
+from util_functions.rule_extractor_utils import build_rule_extractor, add_gazetteer_patterns, RULE_BASED_MODEL
+
+# Default spaCy model. en_core_web_lg has better entity recognition capability than en_core_web_sm
+DEFAULT_MODEL = "en_core_web_lg"
+
+# Entity extractor backends, name -> model. Every stage gets its entities from the active backend (see set_entity_backend):
+# "lg" is the most accurate, "sm" is faster, "rules" (capitalized words and the gazetteer, see build_rule_extractor) is the fastest.
+ENTITY_BACKENDS = {
+    "lg": DEFAULT_MODEL,
+    "sm": "en_core_web_sm",
+    "rules": RULE_BASED_MODEL
+}
+
+# Pipeline components we never use. We only need the entity recognizer, so these are not loaded at all.
+NER_EXCLUDED_COMPONENTS = ["parser", "lemmatizer", "attribute_ruler"]
+
+# Name the VADER sentiment analyzer is registered under, and the nltk resource holding its lexicon
+VADER_MODEL = "vader_lexicon"
+VADER_RESOURCE = "sentiment/vader_lexicon.zip"
+
+# Process-wide registry: model name -> loaded pipeline
+_models = {}
+# Model name -> {"Loads": number of times loaded, "Seconds": total load time}
+_load_stats = {}
+_lock = threading.Lock()
+
+# Model get_nlp returns when no model name is given
+_active_model = DEFAULT_MODEL
+
+
+def set_entity_backend(backend):
+    '''
+    Makes every stage extract entities with the given backend (one of ENTITY_BACKENDS) from now on.
+    Set it before the stages run. Worker processes started afterwards inherit it.
+    '''
+    global _active_model
+    if backend not in ENTITY_BACKENDS:
+        raise ValueError(f"Unknown entity backend {backend!r}, expected one of {sorted(ENTITY_BACKENDS)}")
+    _active_model = ENTITY_BACKENDS[backend]
+
+
+def get_active_model():
+    '''
+    Returns the name of the model get_nlp returns when no model name is given, e.g. to key results that depend on it.
+    '''
+    return _active_model
+
+
+def use_gazetteer_rules(year, names):
+    '''
+    Makes the rule-based extractor also recognize the known people and films of the year's gazetteer (see add_gazetteer_patterns).
+    Each year gets its own pipeline, registered as "rule_based-{year}", so the names of one year never tag the tweets of another
+    when several years run in one process (see run_batch). Call set_entity_backend to go back to the plain extractor.
+    '''
+    global _active_model
+
+    def load():
+        nlp = build_rule_extractor()
+        add_gazetteer_patterns(nlp, names)
+        return nlp
+
+    model_name = f"{RULE_BASED_MODEL}-{year}"
+    get_model(model_name, load)
+    _active_model = model_name
+
+
+def get_nlp(model_name=None):
+    '''
+    Returns a shared NER-only spaCy pipeline for model_name (by default the model of the active backend, see set_entity_backend),
+    loading it on first use.
+    Every module should get its model from here instead of calling spacy.load, so a full run loads each model exactly once.
+    spacy itself is only imported here, so importing a module that uses it does not cost the spacy import.
+    '''
+    if model_name is None:
+        model_name = _active_model
+
+    def load():
+        if model_name == RULE_BASED_MODEL:
+            return build_rule_extractor()
+        import spacy
+        return spacy.load(model_name, exclude=NER_EXCLUDED_COMPONENTS)
+
+    return get_model(model_name, load)
+
+
+def get_model_versions(model_name=None):
+    '''
+    Returns the versions of spacy and of the pipeline get_nlp returns for model_name (the active model by default),
+    e.g. to key results that depend on the entities it extracts. Loads the pipeline if it isn't loaded yet.
+
+    Example output:
+    {"spacy": "3.8.2", "model": "en_core_web_lg", "model_version": "3.8.0"}
+    '''
+    import spacy
+
+    meta = get_nlp(model_name).meta
+    return {"spacy": spacy.__version__, "model": f"{meta.get('lang')}_{meta.get('name')}", "model_version": meta.get("version")}
+
+
+def get_sentiment_analyzer():
+    '''
+    Returns the shared VADER SentimentIntensityAnalyzer, loading it on first use.
+    The lexicon is only downloaded if nltk can't find it, so a machine that has it installed never goes to the network.
+    '''
+    def load():
+        import nltk
+        from nltk.sentiment.vader import SentimentIntensityAnalyzer
+        try:
+            nltk.data.find(VADER_RESOURCE)
+        except LookupError:
+            nltk.download(VADER_MODEL)
+        return SentimentIntensityAnalyzer()
+
+    return get_model(VADER_MODEL, load)
+
+
+def get_model(model_name, load):
+    # Returns the model registered under model_name, calling load() to load it the first time
+    model = _models.get(model_name)
+    if model is not None:
+        return model
+
+    with _lock:
+        # Another thread may have loaded the model while we were waiting for the lock
+        if model_name not in _models:
+            start = time.perf_counter()
+            _models[model_name] = load()
+            elapsed = time.perf_counter() - start
+
+            stats = _load_stats.setdefault(model_name, {"Loads": 0, "Seconds": 0.0})
+            stats["Loads"] += 1
+            stats["Seconds"] += elapsed
+        return _models[model_name]
+
+
+def get_load_stats():
+    '''
+    Returns load counts and load times for every model requested so far.
+
+    Example output:
+    {
+        "en_core_web_lg": {"Loads": 1, "Seconds": 4.21}
+    }
+    '''
+    return {name: dict(stats) for name, stats in _load_stats.items()}
+
+
+def format_load_stats():
+    '''
+    Returns a human-readable summary of get_load_stats().
+    '''
+    if not _load_stats:
+        return "No models loaded"
+    lines = [
+        f"{name}: loaded {stats['Loads']} time(s) in {stats['Seconds']:.2f}s"
+        for name, stats in _load_stats.items()
+    ]
+    return "\n".join(lines)
@@ -1,6 +1,22 @@
 import pandas as pd
 import ast
 import os
+import shutil
+import argparse
+
+# Directory holding the Kaggle movies_metadata.csv and credits.csv: the data directory of the repository,
+# wherever it is checked out and whatever directory the program runs from
+MOVIE_DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+
+# Directory compile_movie_store writes the year-partitioned movies, cast and crew tables to
+MOVIE_STORE_DIR = os.path.join(MOVIE_DATA_DIR, 'movie_store')
+
+# Tables of the store and their columns (besides the 'year' partition column)
+MOVIE_STORE_TABLES = {
+    'movies': ['movie_id', 'title', 'release_date', 'genres', 'production_companies', 'production_countries', 'spoken_languages'],
+    'cast': ['movie_id', 'title', 'character', 'gender', 'name', 'order'],
+    'crew': ['movie_id', 'title', 'job', 'name']
+}
 
 '''
 for each movie, retrieve data for associated cast members & crew members
@@ -10,7 +26,13 @@ Notable info:
 intended to be used for checking eligible candidates for a given award
 i.e. nominees for an award should be one of the "first N" actor/actresses to appear in a film
 '''   
-def create_cast_crew_df(year):    
+def create_cast_crew_df(year, store_dir=MOVIE_STORE_DIR):
+    # read the year's partition of the compiled store if there is one (see compile_movie_store), it is much faster than parsing the csvs
+    if os.path.isdir(store_dir):
+        cast_df = load_movie_store_table('cast', year, store_dir)[['title', 'character', 'gender', 'name', 'order']]
+        crew_df = load_movie_store_table('crew', year, store_dir)[['title', 'job', 'name']]
+        return cast_df, crew_df
+
     movies_credits_df = create_movies_credits_df(year)
     
     # Schema: title, character, gender, name, order (of appearance)
@@ -28,10 +50,19 @@ def create_cast_crew_df(year):
     return cast_df, crew_df
 
 # create combined df w/ movies & credits
-def create_movies_credits_df(year):
+def create_movies_credits_df(year, data_dir=MOVIE_DATA_DIR):
+    df = create_all_movies_credits_df(data_dir)
+
+    # filter movie/credit data for relevant year
+    df = df[df['release_date'].dt.year == year]
+
+    return df
+
+# create combined df w/ movies & credits of every year
+def create_all_movies_credits_df(data_dir=MOVIE_DATA_DIR):
     # declare file paths
-    movies_metadata_path = os.path.join(os.path.dirname(os.path.abspath('')), 'TweetMiner', 'data', 'movies_metadata.csv')
-    credits_path = os.path.join(os.path.dirname(os.path.abspath('')), 'TweetMiner', 'data', 'credits.csv')
+    movies_metadata_path = os.path.join(data_dir, 'movies_metadata.csv')
+    credits_path = os.path.join(data_dir, 'credits.csv')
 
     movies = pd.read_csv(movies_metadata_path)
     credits = pd.read_csv(credits_path)
@@ -68,9 +99,6 @@ def create_movies_credits_df(year):
     df.cast = df.cast.apply(clean_cast_data)
     df.crew = df.crew.apply(clean_crew_data)
 
-    # filter movie/credit data for relevant year
-    df = df[df['release_date'].dt.year == year]
-
     return df
 
 # extract the category names
@@ -114,4 +142,56 @@ def clean_crew_data(crew_str):
             'name': member['name']
         }
         cleaned_crew.append(cleaned_member)
-    return cleaned_crew
\ No newline at end of file
+    return cleaned_crew
+
+# flatten the cleaned cast or crew lists into one row per member, keeping the movie each member belongs to
+def explode_members(df, column, fields):
+    members = df[['movie_id', 'title', 'year', column]].explode(column).dropna(subset=[column])
+    member_df = pd.DataFrame.from_records(members[column].tolist(), columns=fields)
+    return pd.concat([members[['movie_id', 'title', 'year']].reset_index(drop=True), member_df], axis=1)
+
+def compile_movie_store(data_dir=MOVIE_DATA_DIR, store_dir=MOVIE_STORE_DIR):
+    '''
+    One time step that parses movies_metadata.csv and credits.csv (see create_all_movies_credits_df) and writes them
+    as normalized movies, cast and crew tables in Parquet, partitioned by release year:
+    store_dir/cast/year=2012/..., store_dir/crew/year=2012/..., store_dir/movies/year=2012/...
+    create_cast_crew_df then only reads the partition of the year it needs. Run it again if the csvs change.
+    '''
+    df = create_all_movies_credits_df(data_dir)
+    # movies without a release date can't belong to any ceremony
+    df = df[df['release_date'].notna()].reset_index(drop=True)
+    df['movie_id'] = df.index
+    df['year'] = df['release_date'].dt.year
+    # extract_names gives [] instead of a string for missing values, store those as missing
+    for col in ['genres', 'production_companies', 'production_countries', 'spoken_languages']:
+        df[col] = df[col].where(df[col].map(lambda x: isinstance(x, str)), None)
+
+    tables = {
+        'movies': df[MOVIE_STORE_TABLES['movies'] + ['year']],
+        'cast': explode_members(df, 'cast', ['character', 'gender', 'name', 'order']),
+        'crew': explode_members(df, 'crew', ['job', 'name'])
+    }
+
+    # replace any previous store, so no partition of an older compile is left behind
+    if os.path.isdir(store_dir):
+        shutil.rmtree(store_dir)
+    for table, table_df in tables.items():
+        table_df.to_parquet(os.path.join(store_dir, table), partition_cols=['year'], index=False)
+        print(f"Wrote {len(table_df)} rows to {os.path.join(store_dir, table)}")
+
+    return store_dir
+
+def load_movie_store_table(table, year, store_dir=MOVIE_STORE_DIR):
+    # read one year's partition of a table of the compiled store, empty if no movie was released that year
+    path = os.path.join(store_dir, table, f'year={year}')
+    if not os.path.isdir(path):
+        return pd.DataFrame(columns=MOVIE_STORE_TABLES[table])
+    return pd.read_parquet(path)
+
+if __name__ == "__main__":
+    # e.g. 'python -m util_functions.movie_data_utils' from the repository root
+    parser = argparse.ArgumentParser(description="Compile the Kaggle movies and credits csvs into a year-partitioned store.")
+    parser.add_argument("--data-dir", default=MOVIE_DATA_DIR, help="directory holding movies_metadata.csv and credits.csv")
+    parser.add_argument("--store-dir", default=MOVIE_STORE_DIR, help="directory to write the store to")
+    args = parser.parse_args()
+    compile_movie_store(args.data_dir, args.store_dir)
@@ -1,39 +1,70 @@
 import re
-import spacy
-
-nlp = spacy.load("en_core_web_lg")
+from functools import lru_cache
+from util_functions.model_utils import get_nlp
+from util_functions.entity_utils import tweet_entities, NER_BATCH_SIZE
+from util_functions.preprocessing_utils import PUNCTUATION_PATTERN, normalize_text, lookup_tweets, select_tweets, tweet_weights
+from util_functions.time_utils import tweets_in_window
+from util_functions.profile_utils import count
+from util_functions.count_utils import rank_name_counts
 
 # Function to remove punctuation from text
 # This is useful because award names are sometimes found without punctuation
 # For example, "Best Screenplay - Drama" is sometimes found as "Best Screenplay Drama" or "Best Screenplay: Drama"
 def remove_punctuation(text):
-    return ''.join(char for char in text if char.isalnum() or char.isspace())
+    return PUNCTUATION_PATTERN.sub('', text)
 
-# Function to apply regex patterns and extract potential nominees
-def extract_potential_nominees(text, award):
-    nominee_patterns = [
-        r'(\w+(?:\s+\w+)?)\s+is\s+nominated\s+for\s+',
-        r'(\w+(?:\s+\w+)?)\s+was\s+nominated\s+for\s+',
-        r'(\w+(?:\s+\w+)?)\s+has\s+been\s+nominated\s+for\s+',
-        r'nominee\s+(\w+(?:\s+\w+)?)\s+for\s+'
-    ]
+# Nominee patterns, compiled once
+NOMINEE_PATTERNS = [re.compile(pattern, re.IGNORECASE) for pattern in [
+    r'(\w+(?:\s+\w+)?)\s+is\s+nominated\s+for\s+',
+    r'(\w+(?:\s+\w+)?)\s+was\s+nominated\s+for\s+',
+    r'(\w+(?:\s+\w+)?)\s+has\s+been\s+nominated\s+for\s+',
+    r'nominee\s+(\w+(?:\s+\w+)?)\s+for\s+'
+]]
 
-    nominees = []
+# Every nominee pattern contains one of these, so a tweet without them can be skipped after a single regex pass
+NOMINEE_TRIGGER = re.compile(r'nominated\s+for\s|nominee\s', re.IGNORECASE)
 
-    if remove_punctuation(award).lower() in remove_punctuation(text).lower():
-        for pattern in nominee_patterns:
-            # Filter tweets that contain the award name without punctuation
-            matches = re.findall(pattern, text, re.IGNORECASE)
+# Function to apply regex patterns and extract potential nominees
+def match_nominee_patterns(text):
+    nominees = []
+    if NOMINEE_TRIGGER.search(text):
+        for pattern in NOMINEE_PATTERNS:
+            matches = pattern.findall(text)
             nominees.extend(matches)
     return nominees
 
+# Function to extract potential nominees from a tweet if it mentions the award
+# normalized_text is remove_punctuation(text).lower(), which preprocess_tweets already stores for every tweet
+def extract_potential_nominees(text, award, normalized_text=None):
+    if normalized_text is None:
+        normalized_text = remove_punctuation(text).lower()
+    # Filter tweets that contain the award name without punctuation
+    if remove_punctuation(award).lower() in normalized_text:
+        return match_nominee_patterns(text)
+    return []
+
+
+def filter_award_tweets(df, award, postings=None):
+    # Use the award postings if the award was indexed (see build_award_postings)
+    if postings is not None and award in postings:
+        # Selecting the posted ids still checks the id of every tweet
+        count('Tweets', len(df))
+        return select_tweets(df, postings[award])
+
+    # Filter tweets containing award name (without punctuation for lower sensitivity)
+    count('Tweets', len(df))
+    clean_award = remove_punctuation(award).lower()
+    return df[df['normalized_text'].str.contains(clean_award, regex=False)]
 
-def extract_all_nominees(df, award):
+def extract_all_nominees(df, award, entities=None, postings=None, window=None):
     '''
     Returns a JSON with information about the award and a list of nominees based on the tweet data.
     Approach: 
-    1. Extract potential nominees using regex patterns (x nominated for y). These nominees are weighted 3x.
+    1. Extract potential nominees using regex patterns (x nominated for y) from the tweets containing the award name. These nominees are weighted 3x.
     2. Apply NER to the tweets containing the award name. These nominees are weighted 1x. 
+       If the corpus entity table is given (see build_entity_table), entities are looked up there instead of running NER again.
+    If the award postings are given (see build_award_postings), the tweets containing the award name are read from them instead of rescanning every tweet.
+    If a (start, end) window is given (see find_burst_window), only the tweets inside it are used.
     
     Example output:
     {
@@ -41,45 +72,7 @@ def extract_all_nominees(df, award):
         "Nominees": [{"Name": "Nominee 1", "Number of Tweets": 10}, {"Name": "Nominee 2", "Number of Tweets": 5}, ...]
     }
     '''
-    # Check if any keywords are in the award name
-    keywords = ['actor', 'actress', 'performance', 'director']
-    award_lower = award.lower()
-    is_person_award = any(keyword in award_lower for keyword in keywords)
-
-    # Apply the extraction function to the 'clean_text' column
-    df['potential_nominees'] = df['clean_text'].apply(lambda x: extract_potential_nominees(x, award))
-
-    all_nominees = df['potential_nominees'].dropna()
-    nominee_counts = {}
-
-    for nominees in all_nominees:
-        if nominees:  # Check if the list is not empty
-            for nominee in nominees:
-                if nominee in nominee_counts:
-                    nominee_counts[nominee] += 3
-                else:
-                    nominee_counts[nominee] = 3
-
-    # Filter tweets containing award name (without punctuation for lower sensitivity)
-    clean_award = remove_punctuation(award).lower()
-    filtered_df = df[df['clean_text'].apply(lambda x: clean_award in remove_punctuation(x).lower())]
-
-    # Remove RT @ mentions and award name from tweets. These entities are picked up by NER, but are not real nominees. 
-    filtered_df = filtered_df.copy()  
-    filtered_df.loc[:, 'clean_text'] = filtered_df['clean_text'].str.replace('RT @\w+', '', regex=True)
-    filtered_df.loc[:, 'clean_text'] = filtered_df['clean_text'].str.replace(clean_award, '', regex=False)
-    filtered_df.loc[:, 'clean_text'] = filtered_df['clean_text'].str.replace(award, '', regex=False, case=False)
-    
-    # Apply NER to filtered tweets
-    for _, row in filtered_df.iterrows():
-        doc = nlp(row['clean_text'])
-        for ent in doc.ents:
-            # Determine the entity type based on the award name check. Do not nominate people for non-person awards (like best screenplay).
-            if (is_person_award and ent.label_ == 'PERSON') or (not is_person_award and ent.label_ == 'WORK_OF_ART'):
-                name = ent.text
-                if name not in nominee_counts:
-                    nominee_counts[name] = 0
-                nominee_counts[name] += 1
+    nominee_counts = count_nominees(df, award, entities, postings, window)
 
     # Create the JSON structure
     output = {
@@ -97,34 +90,128 @@ def extract_all_nominees(df, award):
 
     return output
 
-# Function to apply regex patterns and extract potential winners
-def extract_potential_winners(text, award):
+def nominee_label(award):
+    # Entity label of the nominees of the award, based on whether the award name mentions a person
+    keywords = ['actor', 'actress', 'performance', 'director']
+    award_lower = award.lower()
+    is_person_award = any(keyword in award_lower for keyword in keywords)
+    return 'PERSON' if is_person_award else 'WORK_OF_ART'
+
+def count_nominees(df, award, entities=None, postings=None, window=None):
+    '''
+    Counts the nominee candidates of the award in the tweets (see extract_all_nominees), in order of first mention.
+    The counts of separate batches of tweets can be added up. Deduplicated tweets count as many times as they were tweeted (see dedup_tweets).
+
+    Example output:
+    {
+        "Argo": 12,
+        "Lincoln": 9,
+        ...
+    }
+    '''
+    # Filter tweets containing award name (without punctuation for lower sensitivity)
+    clean_award = remove_punctuation(award).lower()
+    filtered_df = filter_award_tweets(tweets_in_window(df, window), award, postings)
+
+    # Apply the extraction function to the 'clean_text' column. Only tweets mentioning the award can name its nominees.
+    all_nominees = filtered_df['clean_text'].apply(match_nominee_patterns)
+    count('Regex Passes', len(filtered_df))
+    nominee_counts = {}
+
+    for nominees, weight in zip(all_nominees, tweet_weights(filtered_df)):
+        if nominees:  # Check if the list is not empty
+            for nominee in nominees:
+                if nominee in nominee_counts:
+                    nominee_counts[nominee] += 3 * weight
+                else:
+                    nominee_counts[nominee] = 3 * weight
+
+    # Do not nominate people for non-person awards (like best screenplay)
+    label = nominee_label(award)
+
+    if entities is not None:
+        # RT @ mentions and the award name are picked up by NER, but are not real nominees. Skip entities inside them.
+        not_nominee = re.compile(r'RT @\w+|' + re.escape(clean_award) + '|(?i:' + re.escape(award) + ')')
+        texts = dict(zip(filtered_df['id'], filtered_df['clean_text']))
+        candidates = tweet_entities(entities, filtered_df['id'], label)
+        for tweet_id, start, end, name, weight in zip(candidates['tweet_id'], candidates['start'], candidates['end'], candidates['text'],
+                                                      tweet_weights(candidates)):
+            if any(span_start < end and start < span_end for span_start, span_end in
+                   (match.span() for match in not_nominee.finditer(texts[tweet_id]))):
+                continue
+            if name not in nominee_counts:
+                nominee_counts[name] = 0
+            nominee_counts[name] += weight
+    else:
+        # Remove RT @ mentions and award name from tweets. These entities are picked up by NER, but are not real nominees. 
+        filtered_df = filtered_df.copy()  
+        filtered_df.loc[:, 'clean_text'] = filtered_df['clean_text'].str.replace('RT @\w+', '', regex=True)
+        filtered_df.loc[:, 'clean_text'] = filtered_df['clean_text'].str.replace(clean_award, '', regex=False)
+        filtered_df.loc[:, 'clean_text'] = filtered_df['clean_text'].str.replace(award, '', regex=False, case=False)
+        
+        # Apply NER to filtered tweets
+        nlp = get_nlp()
+        count('NLP Calls', len(filtered_df))
+        for doc, weight in zip(nlp.pipe(filtered_df['clean_text'].tolist(), batch_size=NER_BATCH_SIZE), tweet_weights(filtered_df)):
+            for ent in doc.ents:
+                if ent.label_ == label:
+                    name = ent.text
+                    if name not in nominee_counts:
+                        nominee_counts[name] = 0
+                    nominee_counts[name] += weight
+
+    return nominee_counts
+
+# Stop words removed from the award name in the winner patterns, to reduce sensitivity in the regex
+WINNER_STOP_WORDS = {'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'has', 'he', 'in', 'is', 'it',
+                     'its', 'of', 'on', 'that', 'the', 'to', 'was', 'were', 'will', 'with', 'this', 'but', 'they',
+                     'have', 'had', 'what', 'when', 'where', 'who', 'which', 'why', 'how'}
+
+# Every winner pattern contains one of these, so a tweet without them can be skipped after a single regex pass
+WINNER_TRIGGER = re.compile(r'\s(?:wins|won|awarded|goes|received)\s|\s-\s', re.IGNORECASE)
+
+@lru_cache(maxsize=None)
+def winner_patterns(award):
+    '''
+    Returns the compiled winner patterns for an award, each with a keyword the tweet (lower case) must contain for the pattern to match.
+    They are built once per award and cached.
+    '''
     # Improved regex to properly handle 'just' variations
     just_variations = r'(?:(?:(?:she|he)\s+)?just\s+)?'
-    winner_patterns = [
-        r'(\w+(?:\s+\w+)?)\s+' + just_variations + r'wins\s+(?!' + award + ')',
-        r'(\w+(?:\s+\w+)?)\s+' + just_variations + r'won\s+(?!' + award + ')',
-        r'(\w+(?:\s+\w+)?)\s+' + just_variations + r'awarded\s+(?!' + award + ')',
-        r'(\w+(?:\s+\w+)?)\s+' + just_variations + r'awarded\s+to\s+(?!' + award + ')',
-        r'(\w+(?:\s+\w+)?)\s+' + just_variations + r'goes\s+(?!' + award + ')',
-        r'(\w+(?:\s+\w+)?)\s+' + just_variations + r'received\s+(?!' + award + ')',
+
+    # Remove stop words from the middle of the award name, to reduce sensitivity in the regex
+    award_words = award.split()
+    if len(award_words) > 2:
+        award_words = [award_words[0]] + [word for word in award_words[1:-1] if word.lower() not in WINNER_STOP_WORDS] + [award_words[-1]]
+    not_award = r'(?!' + ' '.join(re.escape(word) for word in award_words) + ')'
+
+    patterns = [
+        ('wins', r'(\w+(?:\s+\w+)?)\s+' + just_variations + r'wins\s+' + not_award),
+        ('won', r'(\w+(?:\s+\w+)?)\s+' + just_variations + r'won\s+' + not_award),
+        ('awarded', r'(\w+(?:\s+\w+)?)\s+' + just_variations + r'awarded\s+' + not_award),
+        ('awarded', r'(\w+(?:\s+\w+)?)\s+' + just_variations + r'awarded\s+to\s+' + not_award),
+        ('goes', r'(\w+(?:\s+\w+)?)\s+' + just_variations + r'goes\s+' + not_award),
+        ('received', r'(\w+(?:\s+\w+)?)\s+' + just_variations + r'received\s+' + not_award),
         # Regex pattern to capture "award - winner -" format
-        r'(\w+(?:\s+\w+)?)\s+-\s+' + re.escape(award) + r'\s+-',
+        (award.lower(), r'(\w+(?:\s+\w+)?)\s+-\s+' + re.escape(award) + r'\s+-'),
     ]
+    return [(keyword, re.compile(pattern, re.IGNORECASE)) for keyword, pattern in patterns]
+
+# Function to apply regex patterns and extract potential winners
+# patterns are the award's winner_patterns, pass them when calling this for many tweets so they are looked up once
+def extract_potential_winners(text, award, patterns=None):
     winners = []
-    for pattern in winner_patterns:
-        # Remove stop words from pattern, to reduce sensitivity in the regex
-        stop_words = {'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'has', 'he', 'in', 'is', 'it',
-                     'its', 'of', 'on', 'that', 'the', 'to', 'was', 'were', 'will', 'with', 'the', 'this', 'but', 'they',
-                     'have', 'had', 'what', 'when', 'where', 'who', 'which', 'why', 'how'}
-        
-        pattern_words = pattern.split()
-        pattern = ' '.join([word for word in pattern_words if word.lower() not in stop_words])
-        matches = re.findall(pattern, text, re.IGNORECASE)
-        winners.extend(matches)
+    if WINNER_TRIGGER.search(text):
+        if patterns is None:
+            patterns = winner_patterns(award)
+        text_lower = text.lower()
+        for keyword, pattern in patterns:
+            if keyword in text_lower:
+                matches = pattern.findall(text)
+                winners.extend(matches)
     return winners
 
-def extract_winners(df, award, nominees):
+def extract_winners(df, award, nominees, window=None):
     '''
     Returns a JSON with the information about the award, and a list of winners and the number of tweets they were mentioned in as a winner. 
 
@@ -146,37 +233,45 @@ def extract_winners(df, award, nominees):
         ]
     }
     '''
-    # Apply the extraction function to the 'text' column
-    df['potential_winners'] = df['clean_text'].apply(lambda x: extract_potential_winners(x, award))
+    # Only scan the tweets inside the (start, end) window if one is given (see find_burst_window)
+    return rank_winners(award, count_potential_winners(tweets_in_window(df, window), award), nominees)
 
-    # Print all non-NaN values in the potential_winners column
-    all_winners = df['potential_winners'].dropna()
+def count_potential_winners(df, award):
+    '''
+    Counts the names the winner patterns find for the award in the tweets, in order of first mention, nominated or not.
+    The counts of separate batches of tweets can be added up. Deduplicated tweets count as many times as they were tweeted (see dedup_tweets).
+    '''
+    # Apply the extraction function to the 'text' column. The tweets are only read, so awards can be processed concurrently.
+    # Look up the award's patterns once, a hit if another stage or batch already compiled them
+    cache_hits = winner_patterns.cache_info().hits
+    patterns = winner_patterns(award)
+    count('Cache Hits', winner_patterns.cache_info().hits - cache_hits)
+    potential_winners = df['clean_text'].apply(lambda x: extract_potential_winners(x, award, patterns))
+    count('Tweets', len(df))
+    count('Regex Passes', len(df))
+
+    # Keep all non-NaN values of the potential winners
     winner_counts = {}
-    for winners in all_winners:
-        if winners:  # Check if the list is not empty
+    for winners, weight in zip(potential_winners, tweet_weights(df)):
+        if winners:  # Check if the list is not empty (or NaN)
             for winner in winners:
-                if winner in nominees:
-                    if winner in winner_counts:
-                        winner_counts[winner] += 1
-                    else:
-                        winner_counts[winner] = 1
+                if winner in winner_counts:
+                    winner_counts[winner] += weight
+                else:
+                    winner_counts[winner] = weight
 
-    # Create the JSON structure
-    output = {
+    return winner_counts
+
+def rank_winners(award, winner_counts, nominees):
+    '''
+    Returns the extract_winners JSON for the award from the potential winner counts (see count_potential_winners).
+    Only nominees can win: the potential winners are intersected with the nominees as arrays, then ranked by number of tweets.
+    '''
+    return {
         "Award": award,
-        "Winners": [
-            {
-                "Name": winner,
-                "Number of Tweets": count
-            } for winner, count in winner_counts.items()
-        ]
+        "Winners": rank_name_counts(winner_counts, keep=nominees)
     }
 
-    # Sort the winners by number of tweets in descending order
-    output["Winners"] = sorted(output["Winners"], key=lambda x: x["Number of Tweets"], reverse=True)
-
-    return output
-
 def extract_all_winners(df, awards, nominees):
     # Extract winners given awards and nominees
     all_winners = []
@@ -184,22 +279,54 @@ def extract_all_winners(df, awards, nominees):
         all_winners.append(extract_winners(df, award, nominee))
     return all_winners
 
+def filter_host_tweets(df, token_index=None):
+    if token_index is not None:
+        # Only check the tweets the token index says can contain 'host'
+        df = select_tweets(df, lookup_tweets(token_index, 'host'))
+    count('Tweets', len(df))
+    return df[df['cleaned_text'].str.lower().str.contains('host')]
+
 def extract_all_hosts(df):
-    tweets = df[df['cleaned_text'].str.lower().str.contains('host')]['cleaned_text']
+    tweets = filter_host_tweets(df)['cleaned_text']
 
     return tweets.tolist()
 
-def extract_all_presenters(df, award):
-    tweets = df[df['cleaned_text'].str.lower().str.contains('present')]['cleaned_text']
+def filter_present_tweets(df, token_index=None):
+    if token_index is not None:
+        # Only check the tweets the token index says can contain 'present'
+        df = select_tweets(df, lookup_tweets(token_index, 'present'))
+    count('Tweets', len(df))
+    return df[df['cleaned_text'].str.lower().str.contains('present')]
+
+def filter_presenter_tweets(df, award, postings=None, token_index=None, window=None):
+    # Only look at the tweets inside the (start, end) window if one is given (see find_burst_window)
+    df = tweets_in_window(df, window)
+
+    # Use the presenter postings if the award was indexed (built over filter_present_tweets, see build_award_postings)
+    if postings is not None and award in postings:
+        # Selecting the posted ids still checks the id of every tweet
+        count('Tweets', len(df))
+        return select_tweets(df, postings[award])
+
+    tweets = filter_present_tweets(df, token_index)
 
     # Filter tweets that contain the award name without punctuation. 
     # Many times, presenters are mentioned in tweets written by individual people. 
     # These people tend to not use the full official award name, and miss the hyphens and other punctuation in the award name. 
-    tweets = tweets[tweets.apply(lambda x: remove_punctuation(award[:len(award)]).lower() in remove_punctuation(x).lower())]
+    tweets = tweets[normalize_text(tweets['cleaned_text']).str.contains(remove_punctuation(award).lower(), regex=False)]
+
+    return tweets
+
+def extract_all_presenters(df, award, postings=None, token_index=None, window=None):
+    tweets = filter_presenter_tweets(df, award, postings, token_index, window)['cleaned_text']
 
     return tweets.tolist()
 
-def extract_all_award_names(df):
+def extract_all_award_names(df, token_index=None):
+    if token_index is not None:
+        # Only check the tweets the token index says can contain 'Best'
+        df = select_tweets(df, lookup_tweets(token_index, 'best'))
+    count('Tweets', len(df))
     tweets = df[df['cleaned_text'].str.contains('Best')]['cleaned_text']
 
     # Filter tweets that contain only one 'best'. Almost all awards start with 'best'. 
@@ -234,16 +361,18 @@ def extract_all_award_names(df):
     tweets = tweets[tweets.apply(lambda x: len(x.split()) > 1 if x else False)]
     
     # Keep only the matched parts and convert to a list
-    tweets = tweets.dropna().tolist()
+    tweets = tweets.dropna()
+    weights = tweet_weights(df.loc[tweets.index])
+    tweets = tweets.tolist()
     
-    # Count occurrences of each award name
+    # Count occurrences of each award name. Deduplicated tweets count as many times as they were tweeted.
     award_counts = {}
-    for tweet in tweets:
+    for tweet, weight in zip(tweets, weights):
         tweet_lower = tweet.lower()
         if tweet_lower in award_counts:
-            award_counts[tweet_lower]['count'] += 1
+            award_counts[tweet_lower]['count'] += weight
         else:
-            award_counts[tweet_lower] = {'original': tweet, 'count': 1}
+            award_counts[tweet_lower] = {'original': tweet, 'count': weight}
     
     # Convert the dictionary to preserve original capitalization
     award_counts = {v['original']: v['count'] for v in award_counts.values()}
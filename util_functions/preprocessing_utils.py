@@ -1,9 +1,25 @@
+import os
+import glob
 import numpy as np
 import pandas as pd
 import re
+from itertools import chain
 from ftfy import fix_text
 import unidecode
 import json
+from concurrent.futures import ProcessPoolExecutor
+from util_functions.profile_utils import count
+
+# Characters that are not letters, digits or whitespace, i.e. everything remove_punctuation drops
+PUNCTUATION_PATTERN = re.compile(r'[^\w\s]|_')
+
+HASHTAG_PATTERN = re.compile(r'#\w+')
+LINK_PATTERN = re.compile(r'http[s]?://\S+')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+# Tweets made only of printable ASCII characters, tabs and line breaks, without '&' (HTML entities).
+# fix_text and unidecode leave these unchanged apart from whitespace, so preprocess_text can skip them.
+PLAIN_ASCII_PATTERN = re.compile(r"[\t\n\r -%'-~]*")
 
 def preprocess_text(text):
     # Fix encoding issues (ampersands, etc.) using ftfy
@@ -33,9 +49,62 @@ def extract_hashtags_and_links(text):
     
     return text, hashtags, links
 
-def preprocess_tweets(filename):
+def collapse_whitespace(texts):
+    '''
+    Vectorized " ".join(x.split()) over a Series of texts.
+    '''
+    return texts.str.replace(WHITESPACE_PATTERN, ' ', regex=True).str.strip()
+
+def preprocess_texts(texts):
+    '''
+    Vectorized preprocess_text over a Series of texts.
+    Plain ASCII tweets (most of them) only need their whitespace collapsed, the rest go through ftfy and unidecode.
+    '''
+    is_plain = texts.str.fullmatch(PLAIN_ASCII_PATTERN)
+    clean_texts = collapse_whitespace(texts.where(is_plain, ''))
+    clean_texts[~is_plain] = texts[~is_plain].apply(preprocess_text)
+    return clean_texts
+
+def extract_all_hashtags_and_links(texts):
+    '''
+    Vectorized extract_hashtags_and_links over a Series of texts. Returns the cleaned texts, hashtags and links as three Series.
+    '''
+    hashtags = texts.str.findall(HASHTAG_PATTERN)
+    links = texts.str.findall(LINK_PATTERN)
+
+    # Remove hashtags, then links, like extract_hashtags_and_links
+    cleaned_texts = texts.str.replace(HASHTAG_PATTERN, '', regex=True).str.replace(LINK_PATTERN, '', regex=True)
+    cleaned_texts = collapse_whitespace(cleaned_texts)
+
+    return cleaned_texts, hashtags, links
+
+def normalize_text(texts):
+    '''
+    Vectorized remove_punctuation(x).lower() over a Series of texts.
+    '''
+    return texts.str.replace(PUNCTUATION_PATTERN, '', regex=True).str.lower()
+
+def preprocess_tweets(filename, workers=1):
+    '''
+    Reads and preprocesses gg{year}.json. With workers > 1 the tweets are preprocessed in chunks on a pool of that many processes.
+    '''
     df = pd.read_json(filename)
+    count('Tweets', len(df))
+
+    if workers > 1:
+        df = preprocess_frame_parallel(df, workers)
+    else:
+        df = preprocess_frame(df)
+
+    # Sort by timestamp
+    df = df.sort_values(by='timestamp')
+
+    return df
 
+def preprocess_frame(df):
+    '''
+    Preprocesses a frame of raw tweets (as found in gg{year}.json), without sorting it.
+    '''
     # Extract user information into separate columns
     df['user_screen_name'] = df['user'].apply(lambda x: x['screen_name'])
     df['user_id'] = df['user'].apply(lambda x: x['id'])
@@ -53,17 +122,189 @@ def preprocess_tweets(filename):
     df = df[['id', 'timestamp', 'user_id', 'user_screen_name', 'text']]
 
     # Apply preprocessing
-    df['clean_text'] = df['text'].apply(preprocess_text)
-
-    # Display new text
-    df['clean_text'].head()
+    df['clean_text'] = preprocess_texts(df['text'])
 
     # Apply preprocessing
-    df[['cleaned_text', 'hashtags', 'links']] = df['text'].apply(
-        lambda x: pd.Series(extract_hashtags_and_links(x))
-    )
+    df['cleaned_text'], df['hashtags'], df['links'] = extract_all_hashtags_and_links(df['text'])
 
-    # Sort by timestamp
+    # Text without punctuation in lower case, which is what award names are matched against
+    df['normalized_text'] = normalize_text(df['clean_text'])
+
+    return df
+
+def preprocess_frame_parallel(df, workers, chunks_per_worker=4):
+    '''
+    Same as preprocess_frame, but splits the frame into chunks that are preprocessed on a pool of worker processes.
+    Each worker gets several chunks so that slow chunks (e.g. with many non-ASCII tweets) don't hold up the pool.
+    The chunks are put back together in their original order, so the result is identical to preprocess_frame.
+    '''
+    num_chunks = min(len(df), workers * chunks_per_worker)
+    if num_chunks <= 1:
+        return preprocess_frame(df)
+
+    boundaries = np.linspace(0, len(df), num_chunks + 1, dtype=int)
+    chunks = [df.iloc[start:end] for start, end in zip(boundaries[:-1], boundaries[1:])]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return pd.concat(executor.map(preprocess_frame, chunks))
+
+# Columns the analysis stages read. Loading only these from a tweet store keeps memory down.
+ANALYSIS_COLUMNS = ['id', 'timestamp', 'clean_text', 'cleaned_text', 'normalized_text']
+
+# Regex for the whitespace and commas between the items of a JSON array
+JSON_ARRAY_SEPARATOR = re.compile(r'[\s,]*')
+
+def iter_tweets(filename, block_size=1 << 20):
+    '''
+    Yields the tweets in filename one at a time, reading block_size characters at a time.
+    The file can either be a JSON array of tweets (like gg{year}.json) or line-delimited JSON (one tweet per line).
+    '''
+    decoder = json.JSONDecoder()
+    with open(filename, 'r') as f:
+        buffer = f.read(block_size).lstrip()
+
+        # Line-delimited JSON
+        if not buffer.startswith('['):
+            f.seek(0)
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+            return
+
+        # JSON array: decode one item at a time, reading more of the file whenever an item is cut off
+        position = 1
+        while True:
+            position = JSON_ARRAY_SEPARATOR.match(buffer, position).end()
+            if buffer.startswith(']', position):
+                return
+            try:
+                tweet, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                more = f.read(block_size)
+                if not more:
+                    raise
+                buffer = buffer[position:] + more
+                position = 0
+                continue
+            yield tweet
+
+def iter_tweet_chunks(filename, chunk_size):
+    '''
+    Yields the tweets in filename as frames of at most chunk_size raw tweets.
+    '''
+    chunk = []
+    for tweet in iter_tweets(filename):
+        chunk.append(tweet)
+        if len(chunk) == chunk_size:
+            yield pd.DataFrame(chunk)
+            chunk = []
+    if chunk:
+        yield pd.DataFrame(chunk)
+
+def ingest_tweets(filename, store_dir, chunk_size=100000):
+    '''
+    Streams the tweets in filename into an on-disk columnar store (a directory of Parquet files, one per chunk).
+    Only one chunk of chunk_size tweets is held in memory at a time, so peak memory does not grow with the size of the file.
+    Returns the path of the store, which load_tweet_store reads back.
+    '''
+    os.makedirs(store_dir, exist_ok=True)
+    # Remove parts left over from a previous ingestion
+    for part in glob.glob(os.path.join(store_dir, 'part-*.parquet')):
+        os.remove(part)
+
+    num_tweets = 0
+    for chunk_index, chunk in enumerate(iter_tweet_chunks(filename, chunk_size)):
+        chunk = preprocess_frame(chunk)
+        chunk.to_parquet(os.path.join(store_dir, f'part-{chunk_index:05d}.parquet'), index=False)
+        num_tweets += len(chunk)
+        print(f"Ingested {num_tweets} tweets")
+
+    return store_dir
+
+def load_tweet_store(store_dir, columns=None):
+    '''
+    Loads a store written by ingest_tweets as a frame sorted by timestamp, like the one preprocess_tweets returns.
+    Pass columns to only load the columns that are needed.
+    Every part is read into one in-memory frame, since the analysis stages need all the tweets at once: unlike ingest_tweets,
+    its memory grows with the size of the store. Loading only ANALYSIS_COLUMNS keeps it well below the raw tweets.
+    '''
+    parts = sorted(glob.glob(os.path.join(store_dir, 'part-*.parquet')))
+    df = pd.concat([pd.read_parquet(part, columns=columns) for part in parts], ignore_index=True)
+
+    # Sort by timestamp. The parts are in file order, so this gives the same order as preprocess_tweets.
     df = df.sort_values(by='timestamp')
 
     return df
+
+def build_token_index(df):
+    '''
+    Builds an inverted index over the tokens of the normalized text: token -> sorted array of the ids of the tweets containing it.
+    Keyword filters look up the tweets containing a keyword here instead of scanning the whole text column.
+
+    Example output:
+    {
+        "host": array([290000000000000012, 290000000000000345, ...]),
+        ...
+    }
+    '''
+    token_lists = df['normalized_text'].str.split()
+    tweet_ids = np.repeat(df['id'].to_numpy(dtype=np.int64), token_lists.str.len().to_numpy())
+    codes, vocabulary = pd.factorize(np.array(list(chain.from_iterable(token_lists)), dtype=object))
+    if len(codes) == 0:
+        return {}
+
+    # Group the tweet ids by token, sorted within each token
+    order = np.lexsort((tweet_ids, codes))
+    codes, tweet_ids = codes[order], tweet_ids[order]
+    boundaries = np.flatnonzero(np.diff(codes)) + 1
+    starts = np.concatenate(([0], boundaries))
+
+    return {vocabulary[codes[start]]: np.unique(ids) for start, ids in zip(starts, np.split(tweet_ids, boundaries))}
+
+def lookup_tweets(token_index, keyword):
+    '''
+    Returns the sorted ids of the tweets with a token containing keyword (case-insensitive).
+    This is a superset of the tweets whose text contains keyword, since keywords are letters only and survive normalization.
+    Callers should check the returned tweets with their exact filter.
+    '''
+    keyword = keyword.lower()
+    postings = [tweet_ids for token, tweet_ids in token_index.items() if keyword in token]
+    if not postings:
+        return np.array([], dtype=np.int64)
+    return np.unique(np.concatenate(postings))
+
+def select_tweets(df, tweet_ids):
+    # Rows of df for the given tweet ids, in the order of df
+    return df[df['id'].isin(tweet_ids)]
+
+def dedup_tweets(df):
+    '''
+    Collapses retweets and other copies of the same text into a single row, so later stages parse every text only once.
+    Texts are compared (by hash) exactly as tweeted, 'RT @user:' prefix included: the keyword filters and NER see that prefix
+    (e.g. "RT @thehost: ..." is a host tweet), so only rows that every stage treats the same are merged and the tallies don't change.
+    Every row kept gets a 'tweet_count' column with the number of tweets it stands for, which the counters add instead of 1
+    (see tweet_weights). Of each set of copies the earliest is kept, and the result is still sorted by timestamp.
+    With time windows, all the copies count at the time of that earliest one (see find_burst_window and tweets_in_window).
+
+    Example output:
+        id                  timestamp            clean_text                  ...  tweet_count
+        290000000000000012  2013-01-14 01:02:03  Argo wins Best Picture      ...  412
+        ...
+    '''
+    keys = pd.util.hash_pandas_object(df[['clean_text', 'cleaned_text']], index=False).to_numpy()
+
+    # np.unique gives the position of the first copy of each text, i.e. the earliest as df is sorted by timestamp
+    _, first, counts = np.unique(keys, return_index=True, return_counts=True)
+    order = np.argsort(first)
+
+    deduped = df.iloc[first[order]].copy()
+    deduped['tweet_count'] = counts[order]
+
+    return deduped
+
+def tweet_weights(df):
+    '''
+    Number of tweets each row stands for: the 'tweet_count' column of a frame (or entity table) built from dedup_tweets, else 1.
+    '''
+    if 'tweet_count' in df.columns:
+        return df['tweet_count'].tolist()
+    return [1] * len(df)
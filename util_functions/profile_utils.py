@@ -0,0 +1,109 @@
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+# Counters every stage reports, see count. 'NLP Calls' counts the texts run through spacy (with nlp() or nlp.pipe).
+# 'Stage Cache Hits' counts the stage results loaded from the stage cache (see cached_stage), 'Cache Hits' every other cache.
+COUNTERS = ['Tweets', 'NLP Calls', 'Regex Passes', 'Cache Hits', 'Stage Cache Hits']
+
+# Events recorded while profiling is enabled, None while it is disabled.
+# When disabled, stage and count return straight away, so the hooks cost next to nothing.
+_events = None
+_start = None
+
+# Stack of the stages currently running, per thread (awards can be processed on a thread pool)
+_active = threading.local()
+
+
+def enable_profiling():
+    global _events, _start
+    _events = []
+    _start = time.perf_counter()
+
+
+def disable_profiling():
+    global _events
+    _events = None
+
+
+def profiling_enabled():
+    return _events is not None
+
+
+@contextmanager
+def stage(name, **details):
+    '''
+    Times the code inside the with block as a stage of the run, e.g. "with stage('find_hosts'):".
+    Stages can be nested. Does nothing unless profiling is enabled.
+    '''
+    if _events is None:
+        yield
+        return
+
+    stack = getattr(_active, 'stack', None)
+    if stack is None:
+        stack = _active.stack = []
+    start = time.perf_counter()
+    event = {"Stage": name, "Details": details, "Start": start - _start, "Counters": dict.fromkeys(COUNTERS, 0)}
+    stack.append(event)
+    try:
+        yield
+    finally:
+        event["Seconds"] = time.perf_counter() - start
+        stack.pop()
+        if _events is not None:
+            _events.append(event)
+
+
+def count(counter, n=1):
+    '''
+    Adds n to one of the COUNTERS of the innermost running stage. Does nothing unless profiling is enabled.
+    Call it once per batch (e.g. with the number of tweets scanned), not once per tweet.
+    '''
+    if _events is None:
+        return
+    stack = getattr(_active, 'stack', None)
+    if stack:
+        stack[-1]["Counters"][counter] += n
+
+
+def profile_summary():
+    '''
+    Totals of the recorded stages, by stage name, in the order the stages first finished.
+    Seconds include nested stages, counters only count what happened in the stage itself.
+
+    Example output:
+    {
+        "find_hosts": {"Calls": 1, "Seconds": 0.42, "Tweets": 5210, "NLP Calls": 0, "Regex Passes": 0, "Cache Hits": 0, "Stage Cache Hits": 0},
+        "process_award": {"Calls": 26, "Seconds": 12.9, ...},
+        ...
+    }
+    '''
+    summary = {}
+    for event in _events or []:
+        totals = summary.setdefault(event["Stage"], {"Calls": 0, "Seconds": 0.0, **dict.fromkeys(COUNTERS, 0)})
+        totals["Calls"] += 1
+        totals["Seconds"] += event["Seconds"]
+        for counter, value in event["Counters"].items():
+            totals[counter] += value
+    return summary
+
+
+def format_profile_summary():
+    widths = {counter: max(12, len(counter)) for counter in COUNTERS}
+    lines = [f"{'Stage':<24} {'Calls':>6} {'Seconds':>9} " + " ".join(f"{counter:>{widths[counter]}}" for counter in COUNTERS)]
+    for name, totals in profile_summary().items():
+        lines.append(f"{name:<24} {totals['Calls']:>6} {totals['Seconds']:>9.3f} " +
+                     " ".join(f"{totals[counter]:>{widths[counter]}}" for counter in COUNTERS))
+    return "\n".join(lines)
+
+
+def save_profile(filename):
+    '''
+    Writes the summary and every recorded stage (in the order they finished) to filename as JSON.
+    "Start" is the number of seconds between enable_profiling and the start of the stage.
+    '''
+    with open(filename, 'w') as f:
+        json.dump({"Summary": profile_summary(), "Trace": _events or []}, f, indent=4)
+    print(f"Profile saved to {filename}")
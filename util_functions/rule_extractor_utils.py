@@ -0,0 +1,40 @@
+# Name the rule-based extractor is registered under in the model registry (see get_nlp)
+RULE_BASED_MODEL = "rule_based"
+
+# Capitalized words that start a tweet phrase but are never part of a name
+NON_NAME_WORDS = ['Best', 'Golden', 'Globes', 'Globe', 'Award', 'Awards', 'Congrats', 'Congratulations', 'Red', 'Carpet',
+                  'Host', 'Hosts', 'Winner', 'Wins', 'Won', 'Motion', 'Picture', 'Television', 'Series', 'Actor', 'Actress',
+                  'Drama', 'Comedy', 'Musical', 'Director', 'Screenplay', 'Score', 'Song', 'Film', 'Feature', 'Foreign',
+                  'Language', 'Animated', 'Supporting', 'Role', 'Performance', 'Mini', 'Made', 'For', 'RT']
+
+# A name is two or three capitalized words, e.g. "Anne Hathaway" or "Daniel Day Lewis"
+NAME_TOKEN = {"IS_TITLE": True, "IS_ALPHA": True, "IS_STOP": False, "TEXT": {"NOT_IN": NON_NAME_WORDS}}
+NAME_PATTERNS = [
+    {"label": "PERSON", "pattern": [NAME_TOKEN] * length} for length in (3, 2)
+]
+
+
+def build_rule_extractor():
+    '''
+    Builds the rule-based entity extractor: a blank English spaCy pipeline with an entity ruler that marks
+    every run of two or three capitalized words as a PERSON. It has no statistical model, so it is much faster
+    than the trained pipelines but less accurate, e.g. it can't tell films from people unless they are in the gazetteer.
+    Known people and films can be added with add_gazetteer_patterns.
+    It produces the same kind of Doc as the trained pipelines, so every stage can use it in their place (see get_nlp).
+    '''
+    import spacy
+
+    nlp = spacy.blank("en")
+    # Phrase patterns (from the gazetteer) match case-insensitively, like build_gazetteer's matcher
+    ruler = nlp.add_pipe("entity_ruler", config={"phrase_matcher_attr": "LOWER"})
+    ruler.add_patterns(NAME_PATTERNS)
+    return nlp
+
+
+def add_gazetteer_patterns(nlp, names):
+    '''
+    Adds the names of a gazetteer (see build_gazetteer), label -> set of names, to the entity ruler of a rule-based extractor.
+    A known name wins over a capitalized run it overlaps if it is longer, e.g. "Silver Linings Playbook" is a WORK_OF_ART.
+    '''
+    ruler = nlp.get_pipe("entity_ruler")
+    ruler.add_patterns([{"label": label, "pattern": name} for label, label_names in names.items() for name in sorted(label_names)])
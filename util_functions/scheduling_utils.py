@@ -0,0 +1,59 @@
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+# Kinds of pool map_ordered can run on
+EXECUTORS = {
+    "thread": ThreadPoolExecutor,
+    "process": ProcessPoolExecutor
+}
+
+# Arguments shared by every task of a process pool, set once per worker process by init_worker
+_shared_args = ()
+
+
+def init_worker(shared_args):
+    global _shared_args
+    _shared_args = shared_args
+
+
+def call_with_shared_args(func, item):
+    return func(*_shared_args, item)
+
+
+def open_pool(workers=1, executor="thread"):
+    '''
+    Returns a thread pool of workers threads that several map_ordered calls can share (shut it down once they are done),
+    or None if there is nothing to share: with one worker, or with processes, which get their shared_args when they start.
+    '''
+    if executor == "thread" and workers > 1:
+        return ThreadPoolExecutor(max_workers=workers)
+    return None
+
+
+def map_ordered(func, items, shared_args=(), workers=1, executor="thread", pool=None):
+    '''
+    Calls func(*shared_args, item) for every item and returns the results in the order of items, whatever order they finish in.
+    With workers > 1 the calls run on a pool of that many threads or processes (executor is "thread" or "process").
+    On a process pool shared_args are sent to each worker once instead of with every item, so they can be large (e.g. the tweets).
+    func must then be a module-level function so it can be pickled.
+    Pass a pool from open_pool to run the calls on it instead of starting a new pool.
+
+    Example output (func=lambda x, y: x + y, items=[1, 2, 3], shared_args=(10,)):
+    [11, 12, 13]
+    '''
+    items = list(items)
+    if workers <= 1 or len(items) <= 1:
+        return [func(*shared_args, item) for item in items]
+
+    if executor not in EXECUTORS:
+        raise ValueError(f"Unknown executor '{executor}', expected one of {', '.join(EXECUTORS)}")
+
+    if pool is not None:
+        return list(pool.map(lambda item: func(*shared_args, item), items))
+
+    workers = min(workers, len(items))
+    if executor == "process":
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(shared_args,)) as pool:
+            return list(pool.map(call_with_shared_args, [func] * len(items), items))
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(lambda item: func(*shared_args, item), items))
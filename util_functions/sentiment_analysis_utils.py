@@ -1,19 +1,71 @@
 import re
-from nltk.sentiment.vader import SentimentIntensityAnalyzer
-import nltk
-import spacy
+import numpy as np
+from functools import lru_cache
+from util_functions.model_utils import get_nlp, get_active_model, get_sentiment_analyzer
+from util_functions.entity_utils import tweet_entities, NER_BATCH_SIZE, CONTEXT_WINDOW
+from util_functions.preprocessing_utils import lookup_tweets, select_tweets
+from util_functions.profile_utils import count
 
-# Download VADER lexicon if you haven't already
-nltk.download('vader_lexicon')
+# Number of tweet texts whose sentiment is remembered (see compound_sentiment)
+SENTIMENT_CACHE_SIZE = 1 << 16
 
-# Initialize VADER SentimentIntensityAnalyzer
-sid = SentimentIntensityAnalyzer()
-nlp = spacy.load("en_core_web_lg")
+# Words that show a name is mentioned for their outfit, when found in the context window around it
+DRESS_TERMS = ['dress', 'outfit', 'wearing', 'looked']
+
+# Number of names whose person check is remembered (see person_name_checks)
+PERSON_CHECK_CACHE_SIZE = 1 << 16
+
+# Names already checked by person_name_checks, (model name, name) -> whether it is a person name, oldest first
+_person_checks = {}
+
+@lru_cache(maxsize=SENTIMENT_CACHE_SIZE)
+def compound_sentiment(text):
+    # VADER compound score of the text. Scored once per distinct text, copies of a tweet hit the cache.
+    # The VADER analyzer is loaded on first use (and its lexicon downloaded only if it is missing)
+    return get_sentiment_analyzer().polarity_scores(text)['compound']
+
+def score_texts(texts):
+    '''
+    Returns the compound sentiment of each distinct text, in one pass over the texts (see compound_sentiment).
+
+    Example output:
+    {
+        "Anne Hathaway looked amazing tonight": 0.5859,
+        ...
+    }
+    '''
+    texts = list(dict.fromkeys(texts))
+    hits = compound_sentiment.cache_info().hits
+    scores = {text: compound_sentiment(text) for text in texts}
+    count('Cache Hits', compound_sentiment.cache_info().hits - hits)
+    return scores
+
+def person_name_checks(names):
+    '''
+    Returns, for each name, whether spacy recognizes it as a PERSON on its own (the first entity found in it is a PERSON).
+    Names that were not checked before with the active model are run through it in one batch, and the results are remembered,
+    up to the PERSON_CHECK_CACHE_SIZE most recent ones.
+    '''
+    model_name = get_active_model()
+    checks = {name: _person_checks.get((model_name, name)) for name in dict.fromkeys(names)}
+    unchecked = [name for name, is_person in checks.items() if is_person is None]
+    if unchecked:
+        nlp = get_nlp(model_name)
+        count('NLP Calls', len(unchecked))
+        for name, doc in zip(unchecked, nlp.pipe(unchecked, batch_size=NER_BATCH_SIZE)):
+            checks[name] = len(doc.ents) > 0 and doc.ents[0].label_ == 'PERSON'
+            _person_checks[(model_name, name)] = checks[name]
+        # Forget the oldest checks
+        while len(_person_checks) > PERSON_CHECK_CACHE_SIZE:
+            del _person_checks[next(iter(_person_checks))]
+    return {name: checks[name] for name in names}
 
 # Function to extract names and calculate sentiment for "dressed" or "outfit" mentions
-def analyze_best_worst_dressed(df):
+def analyze_best_worst_dressed(df, entities=None, token_index=None):
     '''
     Analyzes sentiment of tweets mentioning "dressed" or "outfit" to identify best, worst, and controversial.
+    If the corpus entity table is given (see build_entity_table), names are looked up there instead of running NER again.
+    If the token index is given (see build_token_index), only the tweets it says can mention "dressed" or "outfit" are scanned.
     
     Example output:
     {
@@ -23,7 +75,11 @@ def analyze_best_worst_dressed(df):
     }
     '''
     
+    if token_index is not None:
+        df = select_tweets(df, np.union1d(lookup_tweets(token_index, 'dressed'), lookup_tweets(token_index, 'outfit')))
+
     # Filter tweets with keywords
+    count('Tweets', len(df))
     df_filtered = df[df['clean_text'].str.contains('dressed|outfit', case=False, regex=True)]
     
     # Remove duplicates by keeping first occurrence
@@ -32,37 +88,49 @@ def analyze_best_worst_dressed(df):
     # Filter out retweets
     df_filtered = df_filtered[~df_filtered['clean_text'].str.startswith('RT', na=False)]
     
+    # Find the (name, tweet text) pairs where a name appears in context of dress/outfit,
+    # then score the sentiment of the texts they come from in one pass
+    mentions = []
+    if entities is not None:
+        texts = dict(zip(df_filtered['id'], df_filtered['clean_text']))
+        people = tweet_entities(entities, df_filtered['id'], 'PERSON')
+        for tweet_id, name, context_start, context_end in zip(people['tweet_id'], people['text'], people['context_start'], people['context_end']):
+            text = texts[tweet_id]
+            context = text[context_start:context_end].lower()
+            if any(term in context for term in DRESS_TERMS):
+                mentions.append((name, text))
+    else:
+        nlp = get_nlp()
+        texts = df_filtered['clean_text'].tolist()
+        count('NLP Calls', len(texts))
+        for text, doc in zip(texts, nlp.pipe(texts, batch_size=NER_BATCH_SIZE)):
+            for ent in doc.ents:
+                if ent.label_ == 'PERSON':
+                    # Words before/after name to check for dress terms
+                    context = doc[max(0, ent.start - CONTEXT_WINDOW):min(len(doc), ent.end + CONTEXT_WINDOW)].text.lower()
+                    if any(term in context for term in DRESS_TERMS):
+                        mentions.append((ent.text, text))
+
+    # apply spacy to make sure each name is a person, once per distinct name
+    # (stricter than the entity table's 'is_person': the first entity found in the name must be a PERSON)
+    person_names = {name for name, is_person in person_name_checks([name for name, _ in mentions]).items() if is_person}
+
+    scores = score_texts(text for _, text in mentions)
     results = {}
-    
-    # Process each tweet
-    for index, row in df_filtered.iterrows():
-        text = row['clean_text']
-        sentiment = sid.polarity_scores(text)['compound']
-        
-        # Use spaCy to extract person names
-        doc = nlp(text)
-        for ent in doc.ents:
-            if ent.label_ == 'PERSON':
-                # Only store names that appear in context of dress/outfit
-                name = ent.text
-                context_window = 10  # Words before/after name to check for dress terms
-                start_idx = max(0, ent.start - context_window)
-                end_idx = min(len(doc), ent.end + context_window)
-                context = doc[start_idx:end_idx].text.lower()
-                
-                if any(term in context for term in ['dress', 'outfit', 'wearing', 'looked']):
-                    if name not in results:
-                        results[name] = []
-                    results[name].append(sentiment)
+    for name, text in mentions:
+        if name in person_names:
+            results.setdefault(name, []).append(scores[text])
+
+    return classify_dressed(results)
 
+def classify_dressed(results):
+    '''
+    Classifies people into best, worst, and controversially dressed given the sentiments of the tweets about their outfits.
+    results maps each name to the list of sentiment scores of the tweets mentioning them.
+    '''
     best_dressed, worst_dressed, controversial_dressed = [], [], []
 
     for name, sentiments in results.items():
-        # apply spacy to make sure name is a person
-        doc = nlp(name)
-        if len(doc.ents) == 0 or doc.ents[0].label_ != 'PERSON':
-            continue
-        
         if sentiments:
             avg_sentiment = sum(sentiments) / len(sentiments)
             sentiment_range = max(sentiments) - min(sentiments)
@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+
+# Width of the buckets of the time index
+BUCKET_SECONDS = 60
+
+# A bucket belongs to a burst while it has at least this fraction of the mentions of the peak bucket
+BURST_RATIO = 0.2
+
+# Buckets added before and after a burst. Presenters are tweeted about just before the winner is announced.
+BURST_PADDING = 2
+
+
+def build_time_index(df, bucket_seconds=BUCKET_SECONDS):
+    '''
+    Buckets the tweets of the frame by time, so the tweets about an award can be located in time (see find_burst_window).
+    df must be sorted by timestamp, like the frame preprocess_tweets returns.
+    For a deduplicated frame (see dedup_tweets), "weights" holds the 'tweet_count' of each tweet, so bursts count every copy.
+
+    Example output:
+    {
+        "start": Timestamp('2013-01-14 01:00:00'),
+        "bucket_seconds": 60,
+        "ids": array([290000000000000000, ...]),      # tweet ids, sorted
+        "buckets": array([0, 0, 3, ...]),             # bucket of the tweet with the same position in "ids"
+        "num_buckets": 240,
+        "weights": array([1, 412, 3, ...])           # only for deduplicated frames, the 'tweet_count' in the order of "ids"
+    }
+    '''
+    timestamps = df['timestamp'].to_numpy()
+    start = timestamps[0] if len(timestamps) else np.datetime64(0, 'ns')
+    buckets = ((timestamps - start) // np.timedelta64(bucket_seconds, 's')).astype(np.int64)
+
+    ids = df['id'].to_numpy(dtype=np.int64)
+    order = np.argsort(ids, kind='stable')
+
+    time_index = {
+        "start": pd.Timestamp(start),
+        "bucket_seconds": bucket_seconds,
+        "ids": ids[order],
+        "buckets": buckets[order],
+        "num_buckets": int(buckets[-1]) + 1 if len(buckets) else 0
+    }
+    if 'tweet_count' in df.columns:
+        time_index["weights"] = df['tweet_count'].to_numpy(dtype=np.int64)[order]
+    return time_index
+
+
+def find_burst_window(time_index, tweet_ids, ratio=BURST_RATIO, padding=BURST_PADDING):
+    '''
+    Finds the burst of tweets among tweet_ids (e.g. the tweets mentioning an award), i.e. when the award was announced.
+    The burst is the bucket with the most tweets, widened to the neighbouring buckets with at least ratio times as many tweets,
+    plus padding buckets on either side.
+    Returns the (start, end) timestamps of the window, end excluded, or None if there are no tweets.
+
+    Example output:
+    (Timestamp('2013-01-14 02:13:00'), Timestamp('2013-01-14 02:21:00'))
+    '''
+    # Look up the bucket of each tweet, skipping ids that are not in the index
+    ids = time_index["ids"]
+    tweet_ids = np.asarray(tweet_ids, dtype=np.int64)
+    positions = np.searchsorted(ids, tweet_ids)
+    found = positions < len(ids)
+    found[found] = ids[positions[found]] == tweet_ids[found]
+    positions = positions[found]
+    if len(positions) == 0:
+        return None
+
+    # Deduplicated tweets count as many times as they were tweeted, all at the time of their earliest copy
+    weights = time_index["weights"][positions] if "weights" in time_index else None
+    counts = np.bincount(time_index["buckets"][positions], weights=weights, minlength=time_index["num_buckets"])
+    peak = int(np.argmax(counts))
+    threshold = counts[peak] * ratio
+
+    first, last = peak, peak
+    while first > 0 and counts[first - 1] >= threshold:
+        first -= 1
+    while last < len(counts) - 1 and counts[last + 1] >= threshold:
+        last += 1
+    first = max(0, first - padding)
+    last = min(len(counts) - 1, last + padding)
+
+    bucket = pd.Timedelta(seconds=time_index["bucket_seconds"])
+    return time_index["start"] + first * bucket, time_index["start"] + (last + 1) * bucket
+
+
+def tweets_in_window(df, window):
+    '''
+    Returns the tweets of the frame inside the (start, end) window, end excluded, or the whole frame if window is None.
+    df must be sorted by timestamp, so the window is found by binary search instead of a scan.
+    '''
+    if window is None:
+        return df
+    start, end = df['timestamp'].searchsorted(list(window))
+    return df.iloc[start:end]